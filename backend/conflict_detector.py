@@ -2,17 +2,154 @@
 Conflict detection and analysis system for train scheduling
 """
 from typing import List, Dict, Tuple, Optional
+from collections import Counter, defaultdict
+from functools import lru_cache
 from datetime import datetime, timedelta
 from models import Train, Station, ScheduleEntry, Conflict
-import uuid
+import numpy as np
+import itertools
+import secrets
 import logging
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
+# Pair codes produced by the sweep kernels
+PLATFORM_OVERLAP = 0
+HEADWAY_VIOLATION = 1
+PRIORITY_CONFLICT = 2
+
+PRIORITY_WINDOW_MINUTES = 30  # only flag priority inversions this close together
+
+# Conflict ids only need to be unique, not random: one entropy draw per process
+# plus a shared counter keeps them distinct across detector instances and restarts
+_CONFLICT_ID_PREFIX = secrets.token_hex(4)
+_conflict_ids = itertools.count()
+
+
+@lru_cache(maxsize=1440)
+def _fmt_hhmm(minute_of_day: int) -> str:
+    """Format a minute of the day as HH:MM, cached since conflicts repeat minutes."""
+    return f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+
+
+def _hhmm(dt: datetime) -> str:
+    return _fmt_hhmm(dt.hour * 60 + dt.minute)
+
+
+def _sweep_kernel(arrival, departure, platform_rank, priority, min_headway_s, priority_window_s):
+    """
+    Walk arrival-ordered entries once, returning (first, second, code) pair arrays.
+    
+    Written against plain arrays so it can be compiled with numba. Each platform
+    keeps a linked list of still-open occupants (every open occupant overlaps the
+    arriving train) and remembers its last occupant for the headway check;
+    consecutive arrivals are checked for priority inversion (NaN priority never
+    compares true).
+    """
+    n = arrival.shape[0]
+    n_platforms = platform_rank.max() + 1
+    last_on_platform = np.full(n_platforms, -1, np.int64)
+    open_head = np.full(n_platforms, -1, np.int64)
+    open_count = np.zeros(n_platforms, np.int64)
+    open_next = np.full(n, -1, np.int64)
+    pairs = np.empty((3, 3 * n), np.int64)
+    count = 0
+    
+    for j in range(n):
+        p = platform_rank[j]
+        
+        # Room for an overlap with every open occupant plus headway and priority pairs
+        needed = count + open_count[p] + 2
+        if needed > pairs.shape[1]:
+            grown = np.empty((3, max(2 * pairs.shape[1], needed)), np.int64)
+            grown[:, :count] = pairs[:, :count]
+            pairs = grown
+        
+        # Drop occupants that have left, report the rest as overlapping
+        prev = -1
+        i = open_head[p]
+        while i >= 0:
+            following = open_next[i]
+            if departure[i] <= arrival[j]:
+                if prev < 0:
+                    open_head[p] = following
+                else:
+                    open_next[prev] = following
+                open_count[p] -= 1
+            else:
+                pairs[0, count], pairs[1, count], pairs[2, count] = i, j, PLATFORM_OVERLAP
+                count += 1
+                prev = i
+            i = following
+        open_next[j] = open_head[p]
+        open_head[p] = j
+        open_count[p] += 1
+        
+        # An overlapping predecessor was already reported above
+        i = last_on_platform[p]
+        if i >= 0 and 0 <= arrival[j] - departure[i] < min_headway_s:
+            pairs[0, count], pairs[1, count], pairs[2, count] = i, j, HEADWAY_VIOLATION
+            count += 1
+        last_on_platform[p] = j
+        
+        if j > 0:
+            gap = arrival[j] - arrival[j - 1]
+            if priority[j - 1] < priority[j] and gap > 0 and gap <= priority_window_s:
+                pairs[0, count], pairs[1, count], pairs[2, count] = j - 1, j, PRIORITY_CONFLICT
+                count += 1
+    
+    return pairs[0, :count], pairs[1, :count], pairs[2, :count]
+
+
+def _flag_pairs_numpy(arrival, departure, platform_rank, priority, min_headway_s, priority_window_s):
+    """NumPy equivalent of ``_sweep_kernel`` used when numba is unavailable"""
+    # Occupants of each platform, arrival order kept within a platform
+    order = np.argsort(platform_rank, kind="stable")
+    sorted_arrival = arrival[order]
+    sorted_departure = departure[order]
+    same_platform = platform_rank[order][1:] == platform_rank[order][:-1]
+    headway = sorted_arrival[1:] - sorted_departure[:-1]
+    violation = np.flatnonzero(same_platform & (headway >= 0) & (headway < min_headway_s))
+    
+    # Every later arrival on the platform before an occupant departs overlaps it;
+    # arrivals are sorted per platform, so that is a contiguous run after it
+    bounds = np.concatenate(([0], np.flatnonzero(~same_platform) + 1, [len(order)]))
+    overlap_end = np.empty(len(order), np.int64)
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        overlap_end[lo:hi] = lo + np.searchsorted(sorted_arrival[lo:hi], sorted_departure[lo:hi], side="left")
+    positions = np.arange(len(order))
+    runs = np.maximum(overlap_end - positions - 1, 0)
+    overlap_first = np.repeat(positions, runs)
+    run_start = np.repeat(np.cumsum(runs) - runs, runs)
+    overlap_second = overlap_first + 1 + np.arange(len(overlap_first)) - run_start
+    
+    gap = arrival[1:] - arrival[:-1]
+    inverted = np.flatnonzero((priority[:-1] < priority[1:]) & (gap > 0) & (gap <= priority_window_s))
+    
+    first = np.concatenate((order[overlap_first], order[violation], inverted))
+    second = np.concatenate((order[overlap_second], order[violation + 1], inverted + 1))
+    code = np.concatenate((
+        np.full(len(overlap_first), PLATFORM_OVERLAP, np.int64),
+        np.full(len(violation), HEADWAY_VIOLATION, np.int64),
+        np.full(len(inverted), PRIORITY_CONFLICT, np.int64),
+    ))
+    return first, second, code
+
+
+# Compiled once and cached on disk to avoid paying the JIT cost on every worker boot
+_flag_pairs = njit(cache=True)(_sweep_kernel) if njit is not None else _flag_pairs_numpy
+
 class ConflictDetector:
     def __init__(self, trains: List[Train], stations: Dict[str, Station]):
         self.trains = trains
         self.stations = stations
+        self._train_by_id: Dict[str, Train] = {t.id: t for t in trains}
+        self._scratch_by_station: Dict[str, List[ScheduleEntry]] = defaultdict(list)
         self.min_headway = 5  # minimum minutes between trains
         self.platform_buffer = 2  # minutes buffer for platform changes
         
@@ -22,11 +159,10 @@ class ConflictDetector:
         """
         conflicts = []
         
-        # Group schedule entries by station
-        by_station = {}
+        # Group schedule entries by station, reusing this detector's scratch buffer
+        by_station = self._scratch_by_station
+        by_station.clear()
         for entry in schedule:
-            if entry.station_id not in by_station:
-                by_station[entry.station_id] = []
             by_station[entry.station_id].append(entry)
         
         # Detect conflicts for each station
@@ -34,161 +170,107 @@ class ConflictDetector:
             if station_id not in self.stations:
                 continue
                 
-            station = self.stations[station_id]
-            
-            # Sort by arrival time
+            # Sort by arrival time once; the sweep below relies on this order
             entries.sort(key=lambda x: x.actual_arrival)
             
-            # Detect platform overlap conflicts
-            platform_conflicts = self._detect_platform_overlaps(station_id, entries)
-            conflicts.extend(platform_conflicts)
-            
-            # Detect headway violations
-            headway_conflicts = self._detect_headway_violations(station_id, entries)
-            conflicts.extend(headway_conflicts)
-            
-            # Detect priority conflicts
-            priority_conflicts = self._detect_priority_conflicts(station_id, entries)
-            conflicts.extend(priority_conflicts)
+            conflicts.extend(self._sweep_station(station_id, entries))
         
         return conflicts
     
-    def _detect_platform_overlaps(self, station_id: str, entries: List[ScheduleEntry]) -> List[Conflict]:
-        """Detect trains assigned to same platform with overlapping times"""
-        conflicts = []
-        
-        # Group by platform
-        by_platform = {}
-        for entry in entries:
-            platform = entry.assigned_platform
-            if platform not in by_platform:
-                by_platform[platform] = []
-            by_platform[platform].append(entry)
+    def _sweep_station(self, station_id: str, entries: List[ScheduleEntry]) -> List[Conflict]:
+        """
+        Vectorized sweep over a station's arrival-ordered entries.
         
-        # Check each platform for overlaps
-        for platform, platform_entries in by_platform.items():
-            if len(platform_entries) < 2:
-                continue
-            
-            # Sort by arrival time
-            platform_entries.sort(key=lambda x: x.actual_arrival)
-            
-            for i in range(len(platform_entries) - 1):
-                current = platform_entries[i]
-                next_entry = platform_entries[i + 1]
-                
-                # Check if current departure overlaps with next arrival
-                if current.actual_departure > next_entry.actual_arrival:
-                    overlap_minutes = (current.actual_departure - next_entry.actual_arrival).total_seconds() / 60
-                    
-                    # Get train priorities for severity assessment
-                    current_train = self._get_train(current.train_id)
-                    next_train = self._get_train(next_entry.train_id)
-                    
-                    severity = self._assess_overlap_severity(overlap_minutes, current_train, next_train)
-                    
-                    conflicts.append(Conflict(
-                        id=str(uuid.uuid4()),
-                        type="platform_overlap",
-                        station_id=station_id,
-                        platform=platform,
-                        trains_involved=[current.train_id, next_entry.train_id],
-                        root_cause=f"Platform {platform} double-booked: {current.train_id} departure ({current.actual_departure.strftime('%H:%M')}) overlaps with {next_entry.train_id} arrival ({next_entry.actual_arrival.strftime('%H:%M')}) by {overlap_minutes:.1f} minutes",
-                        severity=severity,
-                        suggested_actions=[
-                            f"Move {next_entry.train_id} to available platform",
-                            f"Delay {next_entry.train_id} by {overlap_minutes + self.platform_buffer:.0f} minutes",
-                            f"Expedite {current.train_id} departure"
-                        ]
-                    ))
+        Entries are laid out as parallel arrays (seconds from the first arrival,
+        platform rank, priority) and handed to the pair-flagging kernel. Only
+        flagged pairs are turned back into ``Conflict`` objects.
+        """
+        if len(entries) < 2:
+            return []
         
-        return conflicts
-    
-    def _detect_headway_violations(self, station_id: str, entries: List[ScheduleEntry]) -> List[Conflict]:
-        """Detect insufficient headway between consecutive trains"""
         conflicts = []
         
-        # Group by platform and sort by time
-        by_platform = {}
-        for entry in entries:
-            platform = entry.assigned_platform
-            if platform not in by_platform:
-                by_platform[platform] = []
-            by_platform[platform].append(entry)
-        
-        for platform, platform_entries in by_platform.items():
-            if len(platform_entries) < 2:
-                continue
-            
-            platform_entries.sort(key=lambda x: x.actual_arrival)
-            
-            for i in range(len(platform_entries) - 1):
-                current = platform_entries[i]
-                next_entry = platform_entries[i + 1]
-                
-                # Calculate headway (time between current departure and next arrival)
-                headway_minutes = (next_entry.actual_arrival - current.actual_departure).total_seconds() / 60
-                
-                if headway_minutes < self.min_headway:
-                    current_train = self._get_train(current.train_id)
-                    next_train = self._get_train(next_entry.train_id)
-                    
-                    severity = "high" if headway_minutes < 2 else "medium"
-                    
-                    conflicts.append(Conflict(
-                        id=str(uuid.uuid4()),
-                        type="headway_violation",
-                        station_id=station_id,
-                        platform=platform,
-                        trains_involved=[current.train_id, next_entry.train_id],
-                        root_cause=f"Insufficient headway on Platform {platform}: only {headway_minutes:.1f} minutes between {current.train_id} departure and {next_entry.train_id} arrival (minimum {self.min_headway} minutes required)",
-                        severity=severity,
-                        suggested_actions=[
-                            f"Delay {next_entry.train_id} by {self.min_headway - headway_minutes + 1:.0f} minutes",
-                            f"Move {next_entry.train_id} to different platform",
-                            f"Expedite {current.train_id} departure by {self.min_headway - headway_minutes:.0f} minutes"
-                        ]
-                    ))
+        reference = entries[0].actual_arrival
+        arrival = np.fromiter(((e.actual_arrival - reference).total_seconds() for e in entries),
+                              dtype=np.float64, count=len(entries))
+        departure = np.fromiter(((e.actual_departure - reference).total_seconds() for e in entries),
+                                dtype=np.float64, count=len(entries))
+        platform = np.fromiter((e.assigned_platform for e in entries), dtype=np.int64, count=len(entries))
+        trains = [self._get_train(e.train_id) for e in entries]
+        priority = np.array([t.priority if t else np.nan for t in trains], dtype=np.float64)
         
-        return conflicts
-    
-    def _detect_priority_conflicts(self, station_id: str, entries: List[ScheduleEntry]) -> List[Conflict]:
-        """Detect cases where lower priority trains are scheduled before higher priority ones"""
-        conflicts = []
+        # Platforms ranked by first appearance so conflicts are grouped in that order
+        _, first_seen, inverse = np.unique(platform, return_index=True, return_inverse=True)
+        platform_rank = np.argsort(np.argsort(first_seen))[inverse]
         
-        # Sort by actual arrival time
-        entries.sort(key=lambda x: x.actual_arrival)
+        first, second, code = _flag_pairs(arrival, departure, platform_rank, priority,
+                                          self.min_headway * 60.0, PRIORITY_WINDOW_MINUTES * 60.0)
         
-        for i in range(len(entries) - 1):
-            current = entries[i]
-            next_entry = entries[i + 1]
+        # Overlaps, then headway violations (each grouped by platform), then priority
+        # inversions; pairs within a group follow arrival order. Every field below is
+        # derived from validated entries, so conflicts skip pydantic validation.
+        group = np.where(code == PRIORITY_CONFLICT, 0, platform_rank[first])
+        for k in np.lexsort((second, first, group, code)):
+            current, next_entry = entries[first[k]], entries[second[k]]
             
-            current_train = self._get_train(current.train_id)
-            next_train = self._get_train(next_entry.train_id)
+            if code[k] == PLATFORM_OVERLAP:
+                overlap_minutes = float(departure[first[k]] - arrival[second[k]]) / 60
+                
+                # Get train priorities for severity assessment
+                severity = self._assess_overlap_severity(overlap_minutes, trains[first[k]], trains[second[k]])
+                
+                conflicts.append(Conflict.model_construct(
+                    id=f"c{_CONFLICT_ID_PREFIX}-{next(_conflict_ids)}",
+                    type="platform_overlap",
+                    station_id=station_id,
+                    platform=current.assigned_platform,
+                    trains_involved=(current.train_id, next_entry.train_id),
+                    root_cause=f"Platform {current.assigned_platform} double-booked: {current.train_id} departure ({_hhmm(current.actual_departure)}) overlaps with {next_entry.train_id} arrival ({_hhmm(next_entry.actual_arrival)}) by {overlap_minutes:.1f} minutes",
+                    severity=severity,
+                    suggested_actions=(
+                        f"Move {next_entry.train_id} to available platform",
+                        f"Delay {next_entry.train_id} by {overlap_minutes + self.platform_buffer:.0f} minutes",
+                        f"Expedite {current.train_id} departure"
+                    )
+                ))
             
-            if not current_train or not next_train:
-                continue
+            elif code[k] == HEADWAY_VIOLATION:
+                headway_minutes = float(arrival[second[k]] - departure[first[k]]) / 60
+                
+                severity = "high" if headway_minutes < 2 else "medium"
+                
+                conflicts.append(Conflict.model_construct(
+                    id=f"c{_CONFLICT_ID_PREFIX}-{next(_conflict_ids)}",
+                    type="headway_violation",
+                    station_id=station_id,
+                    platform=current.assigned_platform,
+                    trains_involved=(current.train_id, next_entry.train_id),
+                    root_cause=f"Insufficient headway on Platform {current.assigned_platform}: only {headway_minutes:.1f} minutes between {current.train_id} departure and {next_entry.train_id} arrival (minimum {self.min_headway} minutes required)",
+                    severity=severity,
+                    suggested_actions=(
+                        f"Delay {next_entry.train_id} by {self.min_headway - headway_minutes + 1:.0f} minutes",
+                        f"Move {next_entry.train_id} to different platform",
+                        f"Expedite {current.train_id} departure by {self.min_headway - headway_minutes:.0f} minutes"
+                    )
+                ))
             
-            # Check if lower priority train is scheduled before higher priority
-            if (current_train.priority < next_train.priority and 
-                current.actual_arrival < next_entry.actual_arrival):
+            else:
+                current_train, next_train = trains[first[k]], trains[second[k]]
+                time_diff = float(arrival[second[k]] - arrival[first[k]]) / 60
                 
-                # Only flag if they're close in time (within 30 minutes)
-                time_diff = (next_entry.actual_arrival - current.actual_arrival).total_seconds() / 60
-                if time_diff <= 30:
-                    conflicts.append(Conflict(
-                        id=str(uuid.uuid4()),
-                        type="priority_conflict",
-                        station_id=station_id,
-                        trains_involved=[current.train_id, next_entry.train_id],
-                        root_cause=f"Priority inversion: {current.train_id} (priority {current_train.priority}) scheduled before {next_entry.train_id} (priority {next_train.priority}) with only {time_diff:.1f} minutes separation",
-                        severity="medium" if time_diff > 15 else "high",
-                        suggested_actions=[
-                            f"Swap arrival order of {current.train_id} and {next_entry.train_id}",
-                            f"Delay {current.train_id} to after {next_entry.train_id}",
-                            f"Move {current.train_id} to different platform to allow {next_entry.train_id} priority"
-                        ]
-                    ))
+                conflicts.append(Conflict.model_construct(
+                    id=f"c{_CONFLICT_ID_PREFIX}-{next(_conflict_ids)}",
+                    type="priority_conflict",
+                    station_id=station_id,
+                    trains_involved=(current.train_id, next_entry.train_id),
+                    root_cause=f"Priority inversion: {current.train_id} (priority {current_train.priority}) scheduled before {next_entry.train_id} (priority {next_train.priority}) with only {time_diff:.1f} minutes separation",
+                    severity="medium" if time_diff > 15 else "high",
+                    suggested_actions=(
+                        f"Swap arrival order of {current.train_id} and {next_entry.train_id}",
+                        f"Delay {current.train_id} to after {next_entry.train_id}",
+                        f"Move {current.train_id} to different platform to allow {next_entry.train_id} priority"
+                    )
+                ))
         
         return conflicts
     
@@ -205,22 +287,21 @@ class ConflictDetector:
     
     def _get_train(self, train_id: str) -> Optional[Train]:
         """Get train object by ID"""
-        return next((t for t in self.trains if t.id == train_id), None)
+        return self._train_by_id.get(train_id)
     
     def analyze_conflict_impact(self, conflicts: List[Conflict], schedule: List[ScheduleEntry]) -> Dict:
         """Analyze the overall impact of conflicts on the schedule"""
         total_conflicts = len(conflicts)
-        critical_conflicts = len([c for c in conflicts if c.severity == "critical"])
-        high_conflicts = len([c for c in conflicts if c.severity == "high"])
+        by_severity = Counter()
+        by_type = Counter()
+        affected_trains = set(itertools.chain.from_iterable(c.trains_involved for c in conflicts))
         
-        # Calculate affected trains
-        affected_trains = set()
-        for conflict in conflicts:
-            affected_trains.update(conflict.trains_involved)
-        
-        # Calculate potential delay impact
+        # Single pass: counts and estimated delay to resolve
         total_delay_risk = 0
         for conflict in conflicts:
+            by_severity[conflict.severity] += 1
+            by_type[conflict.type] += 1
+            
             if conflict.type == "platform_overlap":
                 # Estimate delay needed to resolve overlap
                 total_delay_risk += 10 if conflict.severity == "critical" else 5
@@ -229,18 +310,21 @@ class ConflictDetector:
             elif conflict.type == "priority_conflict":
                 total_delay_risk += 3
         
+        critical_conflicts = by_severity["critical"]
+        high_conflicts = by_severity["high"]
+        
         return {
             "total_conflicts": total_conflicts,
             "by_severity": {
                 "critical": critical_conflicts,
                 "high": high_conflicts,
-                "medium": len([c for c in conflicts if c.severity == "medium"]),
-                "low": len([c for c in conflicts if c.severity == "low"])
+                "medium": by_severity["medium"],
+                "low": by_severity["low"]
             },
             "by_type": {
-                "platform_overlap": len([c for c in conflicts if c.type == "platform_overlap"]),
-                "headway_violation": len([c for c in conflicts if c.type == "headway_violation"]),
-                "priority_conflict": len([c for c in conflicts if c.type == "priority_conflict"])
+                "platform_overlap": by_type["platform_overlap"],
+                "headway_violation": by_type["headway_violation"],
+                "priority_conflict": by_type["priority_conflict"]
             },
             "affected_trains": list(affected_trains),
             "affected_train_count": len(affected_trains),
@@ -0,0 +1,69 @@
+"""Load the static train dataset, reusing a pickle of the validated models on warm starts."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, List, Tuple
+
+from models import Station, Train
+
+logger = logging.getLogger(__name__)
+
+Dataset = Tuple[Dict[str, Station], Dict[str, Dict], List[Train], Dict[str, List[str]]]
+
+
+def _signature(json_path: str) -> Tuple[Any, ...]:
+    # File identity plus model shape, so edits to either the data or the models invalidate the cache
+    st = os.stat(json_path)
+    return (st.st_mtime_ns, st.st_size, tuple(Station.model_fields), tuple(Train.model_fields))
+
+
+def _parse(json_path: str) -> Dataset:
+    with open(json_path) as f:
+        dataset = json.load(f)
+    stations = {
+        s["id"]: Station(**{k: v for k, v in s.items() if k in ("id", "platforms")}) for s in dataset["stations"]
+    }
+    station_metadata = {
+        s["id"]: {k: v for k, v in s.items() if k not in ("id", "platforms")}
+        for s in dataset["stations"]
+    }
+    trains = [Train(**t) for t in dataset["trains"]]
+    return stations, station_metadata, trains, dataset.get("train_legs", {})
+
+
+def load_dataset(json_path: str) -> Dataset:
+    """(stations, station_metadata, trains, train_legs) from json_path, cached next to it as .<name>.pkl."""
+    directory, name = os.path.split(json_path)
+    cache_path = os.path.join(directory, f".{os.path.splitext(name)[0]}.pkl")
+    signature = _signature(json_path)
+
+    try:
+        with open(cache_path, "rb") as f:
+            cached_signature, data = pickle.load(f)
+        if cached_signature == signature:
+            return data
+    except FileNotFoundError:
+        pass
+    except Exception as e:  # stale or corrupt cache: rebuild it
+        logger.info(f"Ignoring dataset cache {cache_path}: {e}")
+
+    data = _parse(json_path)
+    tmp_path = None
+    try:
+        # Write-then-rename so concurrent workers never read a partial pickle
+        fd, tmp_path = tempfile.mkstemp(dir=directory or ".", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump((signature, data), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:  # read-only deployments just parse every start
+        if tmp_path is not None:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+        logger.info(f"Could not write dataset cache {cache_path}: {e}")
+    return data
@@ -1,14 +1,49 @@
 """
 ILP-based optimizer using PuLP for optimal train scheduling
 """
-import pulp
+import importlib.util
+import os
 from typing import List, Dict, Optional, Tuple
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from models import Train, Station, ScheduleEntry, OptimizerSettings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# PuLP solver names tried before falling back to the bundled CBC; resolved on first use
+_HIGHS_SOLVERS = ("HiGHS_CMD", "HiGHS")
+_preferred_solver: Optional[str] = None
+
+
+def _solver_available(pulp, name: str) -> bool:
+    # PuLP releases that predate a solver name raise instead of reporting it unavailable
+    try:
+        return bool(pulp.getSolver(name, msg=False).available())
+    except pulp.PulpSolverError:
+        return False
+
+
+def _make_solver(pulp, time_limit: Optional[int], mip_gap: float, threads: int):
+    """HiGHS when PuLP can reach it, otherwise CBC, with the same time limit, gap and threads."""
+    global _preferred_solver
+    if _preferred_solver is None:
+        _preferred_solver = next(
+            (name for name in _HIGHS_SOLVERS if _solver_available(pulp, name)), "PULP_CBC_CMD"
+        )
+        logger.info(f"ILP solver: {_preferred_solver}")
+    if _preferred_solver != "PULP_CBC_CMD":
+        return pulp.getSolver(_preferred_solver, msg=False, timeLimit=time_limit, gapRel=mip_gap, threads=threads)
+    return pulp.PULP_CBC_CMD(
+        timeLimit=time_limit,
+        msg=0,
+        threads=threads,
+        gapRel=mip_gap,
+        options=['preprocess on', 'heur on'],
+    )
+
+
 class ILPOptimizer:
     def __init__(self, trains: List[Train], stations: Dict[str, Station], settings: OptimizerSettings):
         self.trains = trains
@@ -35,229 +70,192 @@ class ILPOptimizer:
     def _solve_ilp(self, fixed_platforms: Dict[str, int], active_delays: Dict[str, Dict], legs_override: Optional[Dict[str, List[str]]] = None) -> List[ScheduleEntry]:
         """
         Core ILP solver implementation
+        
+        Trains only interact with trains sharing their origin station, so the
+        model splits into one independent sub-problem per station. These are
+        solved concurrently; each solve runs in a solver subprocess (or native
+        code outside the GIL), so threads are enough to keep them all busy.
         """
-        # Create the problem
-        prob = pulp.LpProblem("TrainScheduling", pulp.LpMinimize)
+        # PuLP is imported per station solve so workers that never optimize with ILP don't
+        # load PuLP/CBC at boot; checking for it before any solve starts lets a missing
+        # PuLP take the greedy fallback in optimize()
+        if importlib.util.find_spec("pulp") is None:
+            raise ImportError("PuLP is not installed")
         
         # Apply delays to trains
-        modified_trains = self._apply_delays(active_delays)
+        modified_trains = [t for t in self._apply_delays(active_delays) if t.origin in self.stations]
+        if not modified_trains:
+            return []
         
-        # Decision variables
-        # x[t,s,p,slot] = 1 if train t is assigned to platform p at station s in time slot
-        time_slots = self._generate_time_slots()
+        # Bucket trains by station
+        trains_by_origin: Dict[str, List[Train]] = defaultdict(list)
+        for train in modified_trains:
+            trains_by_origin[train.origin].append(train)
         
-        x = {}  # (train_id, station_id, platform, slot) -> binary variable
-        delay_vars = {}  # train_id -> continuous variable for delay
+        # Share the solver threads between the concurrent station solves
+        threads = max(1, (os.cpu_count() or 1) // len(trains_by_origin))
+        if len(trains_by_origin) == 1:
+            results = [self._solve_station(*next(iter(trains_by_origin.items())), fixed_platforms, threads)]
+        else:
+            with ThreadPoolExecutor(max_workers=len(trains_by_origin)) as pool:
+                results = list(pool.map(
+                    lambda item: self._solve_station(item[0], item[1], fixed_platforms, threads),
+                    trains_by_origin.items(),
+                ))
         
-        # Create variables
-        for train in modified_trains:
-            station_id = train.origin
-            if station_id not in self.stations:
-                continue
-                
-            station = self.stations[station_id]
-            delay_vars[train.id] = pulp.LpVariable(f"delay_{train.id}", lowBound=0, cat='Continuous')
-            
-            for platform in range(1, station.platforms + 1):
-                for slot in time_slots:
-                    var_name = f"x_{train.id}_{station_id}_{platform}_{slot}"
-                    x[(train.id, station_id, platform, slot)] = pulp.LpVariable(var_name, cat='Binary')
+        if any(result is None for result in results):
+            # Fallback to greedy
+            from optimizer import greedy_optimizer
+            return greedy_optimizer(self.trains, self.stations, fixed_platforms)
         
-        # Objective function: minimize total delays + conflict penalties
-        delay_weight = 1.0
-        conflict_weight = 10.0
+        # Reassemble in train order, as a single monolithic solve would return it
+        entry_by_train = {entry.train_id: entry for result in results for entry in result}
+        return [entry_by_train[t.id] for t in modified_trains if t.id in entry_by_train]
+    
+    def _solve_station(self, station_id: str, station_trains: List[Train],
+                       fixed_platforms: Dict[str, int], threads: int) -> Optional[List[ScheduleEntry]]:
+        """
+        Solve the sub-problem for the trains starting at one station
         
-        objective = pulp.lpSum([delay_weight * delay_vars[train.id] for train in modified_trains 
-                               if train.id in delay_vars])
+        Each train gets one continuous start time (minutes from the station's
+        earliest booked arrival) and one binary per platform. Trains sharing a
+        platform are kept apart by big-M disjunctive headway constraints on an
+        ordering binary. Returns None when CBC finds no incumbent.
+        """
+        import pulp
         
-        # Add conflict penalties
-        for station_id, station in self.stations.items():
-            for platform in range(1, station.platforms + 1):
-                for slot in range(len(time_slots) - 1):
-                    # Penalty for overlapping assignments
-                    overlapping_trains = []
-                    for train in modified_trains:
-                        if train.origin == station_id:
-                            key = (train.id, station_id, platform, slot)
-                            if key in x:
-                                overlapping_trains.append(x[key])
-                    
-                    if len(overlapping_trains) > 1:
-                        # Add penalty for multiple trains on same platform/slot
-                        objective += conflict_weight * pulp.lpSum(overlapping_trains)
+        # Create the problem
+        prob = pulp.LpProblem(f"TrainScheduling_{station_id}", pulp.LpMinimize)
+        platforms = range(1, self.stations[station_id].platforms + 1)
         
-        prob += objective
+        base_time = min(t.scheduled_arrival for t in station_trains)
+        scheduled = {}  # train_id -> booked arrival, minutes from base_time
+        dwell = {}  # train_id -> platform occupation, minutes
+        for train in station_trains:
+            scheduled[train.id] = (train.scheduled_arrival - base_time).total_seconds() / 60
+            dwell[train.id] = (train.scheduled_departure - train.scheduled_arrival).total_seconds() / 60
         
-        # Constraints
+        # Packing every train back to back after the latest booking bounds any useful start;
+        # the configured delay window narrows this per train
+        horizon = max(scheduled.values()) + sum(dwell.values()) + self.min_headway * len(station_trains)
+        max_delay = self.settings.max_delay_minutes
+        latest = {
+            train_id: horizon if max_delay is None else min(horizon, booked + max_delay)
+            for train_id, booked in scheduled.items()
+        }
         
-        # 1. Each train must be assigned to exactly one platform and time slot
-        for train in modified_trains:
-            station_id = train.origin
-            if station_id not in self.stations:
-                continue
-                
-            station = self.stations[station_id]
-            assignment_vars = []
-            
-            for platform in range(1, station.platforms + 1):
-                for slot in time_slots:
-                    key = (train.id, station_id, platform, slot)
-                    if key in x:
-                        assignment_vars.append(x[key])
-            
-            if assignment_vars:
-                prob += pulp.lpSum(assignment_vars) == 1, f"assign_{train.id}"
+        # Decision variables
+        start = {}  # train_id -> continuous start time
+        y = {}  # (train_id, platform) -> binary, 1 if train uses platform
         
-        # 2. Platform capacity constraints (no overlapping assignments)
-        for station_id, station in self.stations.items():
-            for platform in range(1, station.platforms + 1):
-                for slot in time_slots:
-                    platform_vars = []
-                    for train in modified_trains:
-                        if train.origin == station_id:
-                            key = (train.id, station_id, platform, slot)
-                            if key in x:
-                                platform_vars.append(x[key])
-                    
-                    if platform_vars:
-                        prob += pulp.lpSum(platform_vars) <= 1, f"capacity_{station_id}_{platform}_{slot}"
+        for train in station_trains:
+            start[train.id] = pulp.LpVariable(
+                f"start_{train.id}", lowBound=scheduled[train.id], upBound=latest[train.id], cat='Continuous'
+            )
+            for platform in platforms:
+                y[(train.id, platform)] = pulp.LpVariable(f"y_{train.id}_{platform}", cat='Binary')
         
-        # 3. Fixed platform constraints (overrides)
-        for train_id, fixed_platform in fixed_platforms.items():
-            train = next((t for t in modified_trains if t.id == train_id), None)
-            if not train:
-                continue
-                
-            station_id = train.origin
-            if station_id not in self.stations:
+        # Delay is the start offset from the booked arrival
+        delay_vars = {train.id: start[train.id] - scheduled[train.id] for train in station_trains}
+        
+        # Objective function: minimize total delays (overlaps are ruled out by constraints)
+        delay_weight = 1.0
+        prob += pulp.lpSum(delay_weight * delay_vars[train.id] for train in station_trains)
+        
+        # Constraints
+        
+        # 1. Each train must be assigned to exactly one platform
+        for train in station_trains:
+            prob += pulp.lpSum(y[(train.id, p)] for p in platforms) == 1, f"assign_{train.id}"
+        
+        # 2. Fixed platform constraints (overrides)
+        for train in station_trains:
+            fixed_platform = fixed_platforms.get(train.id)
+            if fixed_platform is None:
                 continue
             
             # Force assignment to fixed platform only
-            for platform in range(1, self.stations[station_id].platforms + 1):
+            for platform in platforms:
                 if platform != fixed_platform:
-                    for slot in time_slots:
-                        key = (train_id, station_id, platform, slot)
-                        if key in x:
-                            prob += x[key] == 0, f"fixed_{train_id}_{platform}_{slot}"
+                    prob += y[(train.id, platform)] == 0, f"fixed_{train.id}_{platform}"
         
-        # 4. Delay calculation constraints
-        for train in modified_trains:
-            if train.id not in delay_vars:
-                continue
+        # 3. No overlap + minimum headway between trains sharing a platform.
+        #    order[i,j] = 1 when i runs before j; with both on platform p exactly one
+        #    of the two disjuncts is active, otherwise both are relaxed by big_m.
+        #    Pairs whose start windows can never bring them within headway are skipped.
+        for idx, first in enumerate(station_trains):
+            for second in station_trains[idx + 1:]:
+                first_clear = latest[first.id] + dwell[first.id] + self.min_headway
+                second_clear = latest[second.id] + dwell[second.id] + self.min_headway
+                if first_clear <= scheduled[second.id] or second_clear <= scheduled[first.id]:
+                    continue
                 
-            station_id = train.origin
-            if station_id not in self.stations:
-                continue
-            
-            station = self.stations[station_id]
-            scheduled_slot = self._time_to_slot(train.scheduled_arrival)
-            
-            for platform in range(1, station.platforms + 1):
-                for slot_idx, slot in enumerate(time_slots):
-                    key = (train.id, station_id, platform, slot)
-                    if key in x:
-                        # If assigned to this slot, delay >= (slot - scheduled_slot) * slot_duration
-                        slot_delay = max(0, (slot_idx - scheduled_slot) * 5)  # 5 min slots
-                        prob += delay_vars[train.id] >= slot_delay * x[key], f"delay_{train.id}_{slot}"
-        
-        # 5. Minimum headway constraints
-        for station_id, station in self.stations.items():
-            for platform in range(1, station.platforms + 1):
-                for slot in range(len(time_slots) - 1):
-                    current_slot_vars = []
-                    next_slot_vars = []
-                    
-                    for train in modified_trains:
-                        if train.origin == station_id:
-                            current_key = (train.id, station_id, platform, slot)
-                            next_key = (train.id, station_id, platform, slot + 1)
-                            
-                            if current_key in x:
-                                current_slot_vars.append(x[current_key])
-                            if next_key in x:
-                                next_slot_vars.append(x[next_key])
-                    
-                    # Ensure minimum headway between consecutive assignments
-                    if current_slot_vars and next_slot_vars:
-                        prob += pulp.lpSum(current_slot_vars) + pulp.lpSum(next_slot_vars) <= 1, \
-                               f"headway_{station_id}_{platform}_{slot}"
+                # Smallest big-M that still relaxes either disjunct inside the windows
+                big_m = max(first_clear - scheduled[second.id], second_clear - scheduled[first.id])
+                order = pulp.LpVariable(f"order_{first.id}_{second.id}", cat='Binary')
+                for platform in platforms:
+                    y1, y2 = y[(first.id, platform)], y[(second.id, platform)]
+                    prob += (start[first.id] + dwell[first.id] + self.min_headway
+                             <= start[second.id] + big_m * (3 - y1 - y2 - order)), \
+                        f"headway_{first.id}_{second.id}_{platform}"
+                    prob += (start[second.id] + dwell[second.id] + self.min_headway
+                             <= start[first.id] + big_m * (2 - y1 - y2 + order)), \
+                        f"headway_{second.id}_{first.id}_{platform}"
         
         # Solve the problem
-        solver = pulp.PULP_CBC_CMD(timeLimit=self.settings.time_limit_seconds, msg=0)
+        solver = _make_solver(pulp, self.settings.time_limit_seconds, self.settings.mip_gap, threads)
         prob.solve(solver)
         
-        # Extract solution
-        if prob.status == pulp.LpStatusOptimal:
-            return self._extract_solution(x, delay_vars, modified_trains, time_slots)
-        else:
-            logger.warning(f"ILP solver status: {pulp.LpStatus[prob.status]}")
-            # Fallback to greedy
-            from optimizer import greedy_optimizer
-            return greedy_optimizer(self.trains, self.stations, fixed_platforms)
+        # Extract solution; an incumbent found before the time limit is good enough
+        has_incumbent = all(var.varValue is not None for var in start.values())
+        if prob.sol_status in (pulp.LpSolutionOptimal, pulp.LpSolutionIntegerFeasible) and has_incumbent:
+            if prob.sol_status != pulp.LpSolutionOptimal:
+                logger.info(f"ILP for {station_id} stopped with a feasible incumbent: {pulp.LpSolution[prob.sol_status]}")
+            return self._extract_solution(start, y, station_trains, base_time)
+        
+        logger.warning(f"ILP solver status for {station_id}: {pulp.LpStatus[prob.status]}")
+        return None
     
     def _apply_delays(self, active_delays: Dict[str, Dict]) -> List[Train]:
         """Apply active delays to trains"""
         modified_trains = []
         for train in self.trains:
-            modified_train = train.model_copy()
+            delay_info = active_delays.get(train.id)
+            delay_minutes = delay_info.get('delay_minutes', 0) if delay_info else 0
             
-            if train.id in active_delays:
-                delay_info = active_delays[train.id]
-                delay_minutes = delay_info.get('delay_minutes', 0)
-                
-                modified_train.scheduled_arrival += timedelta(minutes=delay_minutes)
-                modified_train.scheduled_departure += timedelta(minutes=delay_minutes)
+            # Undelayed trains are only read downstream, so pass them through uncopied
+            if delay_minutes:
+                shift = timedelta(minutes=delay_minutes)
+                train = train.model_copy(update={
+                    'scheduled_arrival': train.scheduled_arrival + shift,
+                    'scheduled_departure': train.scheduled_departure + shift,
+                })
             
-            modified_trains.append(modified_train)
+            modified_trains.append(train)
         
         return modified_trains
     
-    def _generate_time_slots(self) -> List[int]:
-        """Generate time slots for the optimization horizon"""
-        # Create 5-minute time slots for 24 hours
-        return list(range(0, 288))  # 24 * 60 / 5 = 288 slots
-    
-    def _time_to_slot(self, dt: datetime) -> int:
-        """Convert datetime to time slot index"""
-        # Convert to minutes from midnight
-        minutes = dt.hour * 60 + dt.minute
-        return minutes // 5  # 5-minute slots
-    
-    def _slot_to_time(self, slot: int, base_date: datetime) -> datetime:
-        """Convert slot index to datetime"""
-        minutes = slot * 5
-        hours = minutes // 60
-        mins = minutes % 60
-        return base_date.replace(hour=hours, minute=mins, second=0, microsecond=0)
-    
-    def _extract_solution(self, x: Dict, delay_vars: Dict, trains: List[Train], 
-                         time_slots: List[int]) -> List[ScheduleEntry]:
+    def _extract_solution(self, start: Dict, y: Dict, trains: List[Train],
+                         base_time: datetime) -> List[ScheduleEntry]:
         """Extract the solution from the solved ILP"""
         schedule = []
         
+        # Single pass over the sparse assignment vector; keep the lowest platform
+        # per train, matching insertion order of y
+        assigned = {}
+        for (train_id, platform), var in y.items():
+            value = var.varValue
+            if value is not None and value > 0.5:
+                assigned.setdefault(train_id, platform)
+        
         for train in trains:
             station_id = train.origin
-            if station_id not in self.stations:
-                continue
-            
-            # Find the assigned platform and time slot
-            assigned_platform = None
-            assigned_slot = None
+            assigned_platform = assigned.get(train.id)
             
-            for platform in range(1, self.stations[station_id].platforms + 1):
-                for slot in time_slots:
-                    key = (train.id, station_id, platform, slot)
-                    if key in x and x[key].varValue == 1:
-                        assigned_platform = platform
-                        assigned_slot = slot
-                        break
-                if assigned_platform:
-                    break
-            
-            if assigned_platform and assigned_slot is not None:
+            start_minutes = start[train.id].varValue
+            if assigned_platform and start_minutes is not None:
                 # Calculate actual arrival/departure times
-                base_date = train.scheduled_arrival.replace(hour=0, minute=0, second=0, microsecond=0)
-                actual_arrival = self._slot_to_time(assigned_slot, base_date)
+                actual_arrival = base_time + timedelta(seconds=round(start_minutes * 60))
                 
                 # Ensure arrival is not before scheduled
                 if actual_arrival < train.scheduled_arrival:
@@ -276,7 +274,8 @@ class ILPOptimizer:
                 
                 reason = ", ".join(reason_parts)
                 
-                schedule.append(ScheduleEntry(
+                # Fields come straight from validated trains and solver output
+                schedule.append(ScheduleEntry.model_construct(
                     train_id=train.id,
                     station_id=station_id,
                     assigned_platform=assigned_platform,
@@ -287,7 +286,6 @@ class ILPOptimizer:
         
         return schedule
 
-
 def ilp_optimizer(trains: List[Train], stations: Dict[str, Station], 
                   fixed_platforms: Optional[Dict[str, int]] = None,
                   active_delays: Optional[Dict[str, Dict]] = None,
@@ -303,7 +301,7 @@ def ilp_optimizer(trains: List[Train], stations: Dict[str, Station],
     try:
         return optimizer.optimize(fixed_platforms, active_delays, legs_override=legs_override)
     except Exception:
-        from optimizer import greedy_optimizer_with_delays
+        from optimizer import greedy_optimizer, greedy_optimizer_with_delays
         if active_delays:
             return greedy_optimizer_with_delays(trains, stations, fixed_platforms, active_delays, legs_override)
         return greedy_optimizer(trains, stations, fixed_platforms, legs_override)
@@ -1,35 +1,95 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
 from datetime import datetime, timedelta
 import json
 import asyncio
-from typing import List, Dict, Optional
+from typing import Deque, List, Dict, Optional, Set, Tuple
+from bisect import bisect_left, insort
+import heapq
+from collections import Counter, OrderedDict, deque
+import itertools
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from models import Train, Station, ScheduleEntry, OverrideRequest, LogEntry, TrainDataset, ScheduleWithBaseline, BaseModel, FeasibilityRequest, FeasibilityResponse, Conflict, Recommendation, SimulationRequest, SimulationResponse, OptimizerSettings
-from optimizer import greedy_optimizer, greedy_optimizer_with_delays
+from optimizer import (
+    greedy_optimizer, greedy_optimizer_with_delays, repair_override, platform_intervals, overlapping_slots,
+)
 from ilp_optimizer import ilp_optimizer
 from conflict_detector import detect_conflicts
 from recommendations import generate_recommendations
-import copy
 import threading
-import time
 import logging
+import logging.handlers
+import atexit
+import queue
 import os
+import zlib
 from dotenv import load_dotenv
 try:
     import google.generativeai as genai
 except ImportError:
     genai = None  # type: ignore
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+from fastapi.responses import JSONResponse
 import redis_bus
-from schedule_service import ensure_baseline, recompute_schedule, build_schedule_payload
+from starlette.concurrency import run_in_threadpool
+from schedule_service import (
+    ensure_baseline, recompute_schedule, summarize_schedule, build_schedule_payload,
+    index_by_train, index_by_train_station, arrival_delays, changed_entries,
+)
 from analytics_trends import trend_store
+from dataset_cache import load_dataset
 
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Rail Optimizer API", version="0.1.0")
+# The movement tick reports every conflict and resolution; it hands records to a queue
+# and a listener thread does the console I/O so the event loop never blocks on stdout
+movement_logger = logging.getLogger(f"{__name__}.movements")
+movement_logger.setLevel(logging.INFO)
+movement_logger.propagate = False
+_movement_log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+movement_logger.addHandler(logging.handlers.QueueHandler(_movement_log_queue))
+_movement_log_listener = logging.handlers.QueueListener(_movement_log_queue, logging.StreamHandler())
+_movement_log_listener.start()
+atexit.register(_movement_log_listener.stop)
+
+
+def dumps(obj) -> str:
+    """JSON text for WebSocket messages; orjson when installed, stdlib json otherwise."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj)
+
+
+class FastJSONResponse(JSONResponse):
+    """Responses rendered with orjson when installed (naive datetimes stay naive, like isoformat())."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+app = FastAPI(title="Rail Optimizer API", version="0.1.0", default_response_class=FastJSONResponse)
 
 _main_loop: Optional[asyncio.AbstractEventLoop] = None
+_position_task: Optional[asyncio.Task] = None
+_movement_task: Optional[asyncio.Task] = None
+_movement_wakeup: Optional[asyncio.Event] = None
+# Set by the __main__ entry point so the movement simulation starts with the server
+_autostart_movements = False
+POSITION_BROADCAST_INTERVAL_SECONDS = 1.0
+# The movement tick sleeps until the next due transition, but never less than the
+# former fixed poll interval and never longer than the idle cap (schedule rebuilds
+# that don't notify clients are picked up by then)
+MOVEMENT_MIN_TICK_SECONDS = 1.0
+MOVEMENT_MAX_IDLE_SECONDS = 30.0
 
 
 def _schedule_event_payload(event_type: str, extra: Optional[Dict] = None) -> Dict:
@@ -42,6 +102,7 @@ def _schedule_event_payload(event_type: str, extra: Optional[Dict] = None) -> Di
 
 def notify_realtime_clients(event_type: str = "schedule_update", extra: Optional[Dict] = None) -> None:
     """Fan out schedule/conflict updates to WebSocket clients (Redis or local)."""
+    wake_movement_simulation()
     payload = _schedule_event_payload(event_type, extra)
     if redis_bus.is_enabled():
         redis_bus.publish_event(event_type, extra or {})
@@ -49,7 +110,7 @@ def notify_realtime_clients(event_type: str = "schedule_update", extra: Optional
     loop = _main_loop
     if loop is None:
         return
-    message = json.dumps(payload)
+    message = dumps(payload)
     asyncio.run_coroutine_threadsafe(manager.broadcast(message), loop)
 
 
@@ -63,14 +124,26 @@ async def on_startup() -> None:
         loop = _main_loop
         if loop is None:
             return
-        message = json.dumps(_schedule_event_payload(event_type, data if isinstance(data, dict) else {"value": data}))
+        message = dumps(_schedule_event_payload(event_type, data if isinstance(data, dict) else {"value": data}))
         asyncio.run_coroutine_threadsafe(manager.broadcast(message), loop)
 
     redis_bus.subscribe(_on_redis_message)
 
+    global _position_task
+    _position_task = asyncio.create_task(_broadcast_train_positions())
+    if _autostart_movements:
+        start_train_movement_simulation()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    if _position_task is not None:
+        _position_task.cancel()
+    stop_train_movement_simulation()
+
 
 @app.get("/health")
-def health_check():
+async def health_check():
     return {
         "status": "ok",
         "redis": redis_bus.status(),
@@ -78,6 +151,7 @@ def health_check():
     }
 
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 # Configure CORS for production
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
@@ -99,8 +173,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    max_age=86400,  # let browsers reuse a preflight for a day
 )
 
+# Schedule payloads repeat station ids and reason prefixes, so they compress well
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Configure Gemini AI
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
@@ -115,175 +193,348 @@ else:
     elif genai is None:
         print("Warning: google-generativeai not installed")
 
-# Load dataset
-with open("data/prototype_trains.json") as f:
-    dataset = json.load(f)
-
-train_legs_override: Dict[str, List[str]] = dataset.get("train_legs", {})
-
-stations: Dict[str, Station] = {s["id"]: Station(**{k: v for k, v in s.items() if k in ("id", "platforms")}) for s in dataset["stations"]}
-station_metadata: Dict[str, Dict] = {
-    s["id"]: {k: v for k, v in s.items() if k not in ("id", "platforms")}
-    for s in dataset["stations"]
-}
-trains: List[Train] = [Train(**t) for t in dataset["trains"]]
-
-schedule: List[ScheduleEntry] = []
-baseline_schedule: List[ScheduleEntry] = []
-logs: List[LogEntry] = []
-fixed_overrides: Dict[str, int] = {}
-optimization_history: List[Dict] = []
-current_conflicts: List[Conflict] = []
-current_recommendations: List[Recommendation] = []
-optimizer_settings = OptimizerSettings()
-simulation_scenarios: Dict[str, Dict] = {}
+
+CONFLICT_LOG_MAX = 1000  # track conflicts and resolutions kept for /conflicts
+
+
+@dataclass(slots=True)
+class AppState:
+    """Everything the endpoints replace or mutate at runtime; one instance per worker."""
+    trains: List[Train]
+    stations: Dict[str, Station]
+    trains_by_id: Dict[str, Train] = field(default_factory=dict)  # rebuilt whenever trains is replaced
+    trains_version: int = 0  # bumped whenever trains is replaced; part of the schedule cache key
+    schedule: List[ScheduleEntry] = field(default_factory=list)
+    legs_schedule: Optional[List[ScheduleEntry]] = None  # schedule when it was last built with train_legs_override
+    baseline_schedule: List[ScheduleEntry] = field(default_factory=list)
+    fixed_overrides: Dict[str, int] = field(default_factory=dict)
+    active_delays: Dict[str, Dict] = field(default_factory=dict)
+    current_conflicts: List[Conflict] = field(default_factory=list)
+    current_recommendations: List[Recommendation] = field(default_factory=list)
+    optimizer_settings: OptimizerSettings = field(default_factory=OptimizerSettings)
+    simulation_scenarios: Dict[str, Dict] = field(default_factory=dict)
+    train_movements: Dict[str, "TrainMovement"] = field(default_factory=dict)
+    track_occupancy: Dict[str, Dict] = field(default_factory=dict)  # track_id -> {train_id, start_time, end_time}
+    # Start-sorted (start, end, train_id) windows of the trains on each track
+    track_intervals: Dict[int, List[Tuple[datetime, datetime, str]]] = field(default_factory=dict)
+    train_tracks: Dict[str, Tuple[int, datetime, datetime]] = field(default_factory=dict)  # train_id -> registered window
+    track_expiry: List[Tuple[datetime, int, str]] = field(default_factory=list)  # heap of (end_time, track_key, train_id)
+    track_pending: Dict[str, None] = field(default_factory=dict)  # trains to (re)check, in insertion order
+    conflict_log: Deque[Dict] = field(default_factory=lambda: deque(maxlen=CONFLICT_LOG_MAX))
+    movements_version: int = 0  # bumped whenever track_occupancy or conflict_log changes
+
+    def set_trains(self, trains: List[Train]) -> None:
+        """Replace the train list, keeping the id index and cache version in step."""
+        self.trains = trains
+        self.trains_by_id = {t.id: t for t in trains}
+        self.trains_version += 1
+
+
+# Load dataset (validated models are cached on disk between starts)
+station_metadata: Dict[str, Dict]
+train_legs_override: Dict[str, List[str]]
+_stations, station_metadata, _trains, train_legs_override = load_dataset("data/prototype_trains.json")
+state = AppState(trains=_trains, stations=_stations, trains_by_id={t.id: t for t in _trains})
+
+# Audit trails are bounded so a long-running worker doesn't grow without limit
+LOG_MAX = int(os.getenv("LOG_MAX", "10000"))
+# Per-item diagnostics (one line per train/tick) are only emitted when LOG_VERBOSE=1
+VERBOSE_LOGS = os.getenv("LOG_VERBOSE", "0") == "1"
+logs: Deque[LogEntry] = deque(maxlen=LOG_MAX)
+
+
+def _log(action: str, details: str, now: Optional[datetime] = None) -> None:
+    """Append an audit entry; fields come from our own code, so skip model validation."""
+    logs.append(LogEntry.model_construct(timestamp=now or datetime.now(), action=action, details=details))
+
+
+optimization_history: Deque[Dict] = deque(maxlen=LOG_MAX)
+
+# Greedy runs are deterministic in (trains, overrides, delays, legs), so identical
+# requests (repeat simulations, baseline rebuilds) reuse the previous result
+SCHEDULE_CACHE_SIZE = 64
+_schedule_cache: "OrderedDict[tuple, List[ScheduleEntry]]" = OrderedDict()
+_schedule_cache_lock = threading.Lock()
+
+# Sync endpoints run in the threadpool while the movement tick and async handlers run on
+# the event loop. _schedule_lock serializes schedule rebuilds (schedule, baseline,
+# current_conflicts); fixed_overrides and active_delays are replaced rather than edited so
+# a rebuild in progress keeps reading a consistent snapshot. _movements_lock covers
+# train_movements, track occupancy and conflict_log, which each tick updates together.
+_schedule_lock = threading.RLock()
+_movements_lock = threading.RLock()
+
+
+def _greedy_cache_key(overrides, delays, legs_override) -> tuple:
+    delay_key = tuple(sorted(
+        (train_id, info.get("delay_minutes", 0), info.get("delay_type", "unknown"))
+        for train_id, info in (delays or {}).items()
+    ))
+    return (state.trains_version, frozenset(overrides.items()), delay_key, legs_override is not None)
+
+
+def peek_greedy_cached(
+    overrides: Dict[str, int],
+    delays: Optional[Dict[str, Dict]] = None,
+    legs_override: Optional[Dict[str, List[str]]] = None,
+) -> Optional[List[ScheduleEntry]]:
+    """The memoized greedy schedule for these inputs, or None without computing it"""
+    key = _greedy_cache_key(overrides, delays, legs_override)
+    with _schedule_cache_lock:
+        cached = _schedule_cache.get(key)
+        if cached is None:
+            return None
+        _schedule_cache.move_to_end(key)
+        # Shallow copy: entries are never edited in place, but callers may reorder the list
+        return list(cached)
+
+
+def run_greedy_cached(
+    overrides: Dict[str, int],
+    delays: Optional[Dict[str, Dict]] = None,
+    legs_override: Optional[Dict[str, List[str]]] = None,
+) -> List[ScheduleEntry]:
+    """greedy_optimizer / greedy_optimizer_with_delays behind an LRU keyed on their inputs"""
+    cached = peek_greedy_cached(overrides, delays, legs_override)
+    if cached is not None:
+        return cached
+    key = _greedy_cache_key(overrides, delays, legs_override)
+
+    if delays:
+        result = greedy_optimizer_with_delays(state.trains, state.stations, overrides, delays, legs_override)
+    else:
+        result = greedy_optimizer(state.trains, state.stations, overrides, legs_override=legs_override)
+
+    with _schedule_cache_lock:
+        _schedule_cache[key] = result
+        if len(_schedule_cache) > SCHEDULE_CACHE_SIZE:
+            _schedule_cache.popitem(last=False)
+    return list(result)
+
+
+# Simulated override responses, valid only while the live schedule they were diffed against is current
+SIMULATION_CACHE_SIZE = 128
+_simulation_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+# detect_conflicts results keyed on everything the detector reads from a schedule, so
+# repeated scans of the same schedule (/conflicts, /feasibility, simulations) are shared
+CONFLICT_CACHE_SIZE = 64
+_conflict_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+
+def detect_conflicts_cached(schedule: List[ScheduleEntry]) -> tuple:
+    """detect_conflicts(state.trains, state.stations, schedule) behind an LRU"""
+    key = (state.trains_version, tuple(
+        (e.train_id, e.station_id, e.assigned_platform, e.actual_arrival, e.actual_departure)
+        for e in schedule
+    ))
+    with _schedule_cache_lock:
+        cached = _conflict_cache.get(key)
+        if cached is not None:
+            _conflict_cache.move_to_end(key)
+    if cached is None:
+        cached = detect_conflicts(state.trains, state.stations, schedule)
+        with _schedule_cache_lock:
+            _conflict_cache[key] = cached
+            if len(_conflict_cache) > CONFLICT_CACHE_SIZE:
+                _conflict_cache.popitem(last=False)
+    conflicts, impact = cached
+    return list(conflicts), dict(impact)
+
+
+# (schedule list, trains_version, fingerprint) for the live schedule, like _delay_vector_cache
+_fingerprint_cache: Optional[tuple] = None
+
+
+def schedule_fingerprint(schedule: List[ScheduleEntry]) -> int:
+    """CRC32 over the entry fields clients see; memoized for the live schedule"""
+    global _fingerprint_cache
+    cached = _fingerprint_cache
+    if cached is not None and cached[0] is schedule and cached[1] == state.trains_version:
+        return cached[2]
+    fingerprint = zlib.crc32("\n".join(
+        f"{e.train_id}|{e.station_id}|{e.assigned_platform}|{e.actual_arrival.isoformat()}|"
+        f"{e.actual_departure.isoformat()}|{e.reason}"
+        for e in schedule
+    ).encode())
+    if schedule is state.schedule:
+        _fingerprint_cache = (schedule, state.trains_version, fingerprint)
+    return fingerprint
+
+
+def _etag(*parts) -> str:
+    return f'"{zlib.crc32(repr(parts).encode()):08x}"'
+
+
+def _not_modified(request: Request, etag: str) -> Optional[Response]:
+    """304 response when the client's If-None-Match already names etag"""
+    header = request.headers.get("if-none-match")
+    if header and (header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
 _schedule_initialized = False
 
 
 def ensure_schedule_state() -> None:
-    global schedule, baseline_schedule, current_conflicts, _schedule_initialized
-    if _schedule_initialized and schedule:
-        return
-    baseline_schedule = ensure_baseline(trains, stations, baseline_schedule, logs, train_legs_override)
-    old = copy.deepcopy(schedule)
-    schedule, current_conflicts, step = recompute_schedule(
-        trains, stations, fixed_overrides, active_delays, optimizer_settings, old, train_legs_override
-    )
-    optimization_history.append(step)
-    _schedule_initialized = True
+    global _schedule_initialized
+    with _schedule_lock:
+        if _schedule_initialized and state.schedule:
+            return
+        state.baseline_schedule = ensure_baseline(
+            state.trains, state.stations, state.baseline_schedule, logs, train_legs_override
+        )
+        # Optimizers return new lists and entries are never edited in place, so the
+        # current list is already an immutable snapshot for the diff
+        old = state.schedule
+        state.schedule, state.current_conflicts, step = recompute_schedule(
+            state.trains, state.stations, state.fixed_overrides, state.active_delays, state.optimizer_settings,
+            old, train_legs_override,
+        )
+        state.legs_schedule = state.schedule
+        optimization_history.append(step)
+        _schedule_initialized = True
 
 
 def run_schedule_recompute(log_audit: bool = True) -> None:
-    global schedule, baseline_schedule, current_conflicts
-    if not baseline_schedule:
-        baseline_schedule = ensure_baseline(trains, stations, baseline_schedule, logs, train_legs_override)
-    old = copy.deepcopy(schedule)
-    schedule, current_conflicts, step = recompute_schedule(
-        trains, stations, fixed_overrides, active_delays, optimizer_settings, old, train_legs_override
-    )
-    optimization_history.append(step)
-    if log_audit:
-        logs.append(
-            LogEntry(
-                timestamp=datetime.now(),
-                action="schedule_recomputed",
-                details=f"Recomputed schedule: {len(step.get('schedule_changes', []))} changes, {len(current_conflicts)} conflicts",
+    with _schedule_lock:
+        if not state.baseline_schedule:
+            state.baseline_schedule = ensure_baseline(
+                state.trains, state.stations, state.baseline_schedule, logs, train_legs_override
+            )
+        # Optimizers return new lists and entries are never edited in place, so the
+        # current list is already an immutable snapshot for the diff
+        old = state.schedule
+        state.schedule, state.current_conflicts, step = recompute_schedule(
+            state.trains, state.stations, state.fixed_overrides, state.active_delays, state.optimizer_settings,
+            old, train_legs_override,
+        )
+        state.legs_schedule = state.schedule
+        optimization_history.append(step)
+        if log_audit:
+            _log(
+                "schedule_recomputed",
+                f"Recomputed schedule: {len(step.get('schedule_changes', []))} changes, {len(state.current_conflicts)} conflicts",
             )
+    notify_realtime_clients("schedule_update", {"changes": len(step.get("schedule_changes", []))})
+
+
+def run_override_repair(train_id: str) -> None:
+    """Apply an override by local repair when possible, else fall back to a full recompute."""
+    with _schedule_lock:
+        repaired = None
+        # Repair patches the live schedule, so it must already carry every train's legs; the
+        # greedy rebuilds behind /clear-delays and the inject endpoints run without them
+        if (state.optimizer_settings.mode != "ilp" and not state.active_delays and state.schedule
+                and state.schedule is state.legs_schedule):
+            # A prior /simulate-override of this exact change already computed the schedule
+            repaired = peek_greedy_cached(state.fixed_overrides, legs_override=train_legs_override)
+            if repaired is None:
+                repaired = repair_override(
+                    state.schedule, state.trains, state.stations, state.fixed_overrides, train_id, train_legs_override
+                )
+        if repaired is None:
+            run_schedule_recompute(log_audit=False)
+            return
+        old = state.schedule
+        state.schedule = state.legs_schedule = repaired
+        state.current_conflicts, step = summarize_schedule(
+            state.trains, state.stations, state.fixed_overrides, state.schedule, old
         )
+        optimization_history.append(step)
     notify_realtime_clients("schedule_update", {"changes": len(step.get("schedule_changes", []))})
 
 
+def run_greedy_recompute(with_delays: bool) -> None:
+    """Rebuild the live schedule with greedy from the current overrides (and active delays)"""
+    with _schedule_lock:
+        state.schedule = run_greedy_cached(state.fixed_overrides, state.active_delays if with_delays else None)
+
+
 @app.get("/trains")
 def get_trains():
-    return trains
+    return state.trains
 
 @app.post("/trains")
 def post_trains(payload: TrainDataset):
-    global trains, schedule, baseline_schedule, fixed_overrides
-    trains = payload.trains
-    schedule = []
-    baseline_schedule = []
-    fixed_overrides = {}
-    logs.append(LogEntry(timestamp=datetime.now(), action="dataset_loaded", details=f"Loaded {len(trains)} trains"))
-    return {"message": "Dataset loaded", "train_count": len(trains)}
+    with _schedule_lock:
+        state.set_trains(payload.trains)
+        state.schedule = []
+        state.baseline_schedule = []
+        state.fixed_overrides = {}
+    _log("dataset_loaded", f"Loaded {len(state.trains)} trains")
+    return {"message": "Dataset loaded", "train_count": len(state.trains)}
 
 @app.get("/schedule", response_model=ScheduleWithBaseline)
-def get_schedule():
+async def get_schedule():
     """Read-only schedule snapshot (does not re-optimize or append audit logs)."""
-    ensure_schedule_state()
-    return build_schedule_payload(schedule, baseline_schedule, trains, current_conflicts)
+    # The first call may run the optimizer; keep that off the event loop
+    await run_in_threadpool(ensure_schedule_state)
+    return build_schedule_payload(state.schedule, state.baseline_schedule, state.trains, state.current_conflicts)
 
 
 @app.post("/schedule/recompute")
 def post_schedule_recompute():
     run_schedule_recompute(log_audit=True)
-    return build_schedule_payload(schedule, baseline_schedule, trains, current_conflicts)
+    return build_schedule_payload(state.schedule, state.baseline_schedule, state.trains, state.current_conflicts)
 
 
 @app.post("/override")
-def override_schedule(req: OverrideRequest):
-    global fixed_overrides, schedule, optimization_history
+async def override_schedule(req: OverrideRequest):
+    now = datetime.now()
     
-    ensure_schedule_state()
+    await run_in_threadpool(ensure_schedule_state)
 
-    logs.append(LogEntry(
-        timestamp=datetime.now(),
-        action="override_requested",
-        details=f"Controller requests: Move {req.train_id} to Platform {req.new_platform} at {req.station_id}"
-    ))
+    _log("override_requested", f"Controller requests: Move {req.train_id} to Platform {req.new_platform} at {req.station_id}", now)
 
     # Validate platform exists
-    station = stations.get(req.station_id)
+    station = state.stations.get(req.station_id)
     if not station:
-        logs.append(LogEntry(
-            timestamp=datetime.now(),
-            action="override_failed",
-            details=f"❌ Override FAILED: Station {req.station_id} not found"
-        ))
+        _log("override_failed", f"❌ Override FAILED: Station {req.station_id} not found", now)
         raise HTTPException(status_code=404, detail="Station not found")
         
     if req.new_platform < 1 or req.new_platform > station.platforms:
-        logs.append(LogEntry(
-            timestamp=datetime.now(),
-            action="override_failed",
-            details=f"❌ Override FAILED: Platform {req.new_platform} invalid at {req.station_id} (only {station.platforms} platforms available)"
-        ))
+        _log("override_failed", f"❌ Override FAILED: Platform {req.new_platform} invalid at {req.station_id} (only {station.platforms} platforms available)", now)
         raise HTTPException(status_code=400, detail="Invalid platform")
 
     # Store old assignment for comparison
-    old_assignment = next((s for s in schedule if s.train_id == req.train_id), None)
+    old_assignment = index_by_train(state.schedule).get(req.train_id)
     old_platform = old_assignment.assigned_platform if old_assignment else "none"
     
     # Apply the override immediately (controller decision is final)
-    fixed_overrides[req.train_id] = req.new_platform
+    state.fixed_overrides = {**state.fixed_overrides, req.train_id: req.new_platform}
     
-    logs.append(LogEntry(
-        timestamp=datetime.now(),
-        action="override_applied",
-        details=f"🔧 Override APPLIED: {req.train_id} forced to P{req.new_platform} (was P{old_platform})"
-    ))
+    _log("override_applied", f"🔧 Override APPLIED: {req.train_id} forced to P{req.new_platform} (was P{old_platform})", now)
 
-    old_schedule = copy.deepcopy(schedule)
-    run_schedule_recompute(log_audit=False)
+    # Snapshot of the current entries; recompute rebinds schedule instead of editing it
+    old_schedule = state.schedule
+    await run_in_threadpool(run_override_repair, req.train_id)
 
     conflicts_caused = []
-    for new_entry in schedule:
-        old_entry = next((s for s in old_schedule if s.train_id == new_entry.train_id and s.station_id == new_entry.station_id), None)
+    for new_entry, old_entry in changed_entries(old_schedule, state.schedule):
         if old_entry and new_entry.train_id != req.train_id:
-            if old_entry.assigned_platform != new_entry.assigned_platform or old_entry.actual_arrival != new_entry.actual_arrival:
-                train = next((t for t in trains if t.id == new_entry.train_id), None)
-                if train:
-                    old_delay = (old_entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0
-                    new_delay = (new_entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0
-                    conflicts_caused.append({
-                        "train_id": new_entry.train_id,
-                        "old_platform": old_entry.assigned_platform,
-                        "new_platform": new_entry.assigned_platform,
-                        "delay_change": new_delay - old_delay
-                    })
+            train = state.trains_by_id.get(new_entry.train_id)
+            if train:
+                old_delay = (old_entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0
+                new_delay = (new_entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0
+                conflicts_caused.append({
+                    "train_id": new_entry.train_id,
+                    "old_platform": old_entry.assigned_platform,
+                    "new_platform": new_entry.assigned_platform,
+                    "delay_change": new_delay - old_delay
+                })
 
     for conflict in conflicts_caused:
         if conflict["delay_change"] > 0:
-            logs.append(LogEntry(
-                timestamp=datetime.now(),
-                action="conflict_resolution",
-                details=f"⚠️  CONFLICT: {conflict['train_id']} moved P{conflict['old_platform']}→P{conflict['new_platform']}, +{conflict['delay_change']:.1f}min delay due to override"
-            ))
+            _log("conflict_resolution", f"⚠️  CONFLICT: {conflict['train_id']} moved P{conflict['old_platform']}→P{conflict['new_platform']}, +{conflict['delay_change']:.1f}min delay due to override", now)
         else:
-            logs.append(LogEntry(
-                timestamp=datetime.now(),
-                action="conflict_resolution",
-                details=f"🔄 REBALANCE: {conflict['train_id']} moved P{conflict['old_platform']}→P{conflict['new_platform']} due to override"
-            ))
+            _log("conflict_resolution", f"🔄 REBALANCE: {conflict['train_id']} moved P{conflict['old_platform']}→P{conflict['new_platform']} due to override", now)
 
-    reason_for_train = next((s.reason for s in schedule if s.train_id == req.train_id), "re-optimized")
+    target_entry = index_by_train(state.schedule).get(req.train_id)
+    reason_for_train = target_entry.reason if target_entry else "re-optimized"
     
     # Final success log
-    logs.append(LogEntry(
-        timestamp=datetime.now(),
-        action="override_completed",
-        details=f"✅ Override COMPLETED: {req.train_id} successfully assigned to P{req.new_platform}, {len(conflicts_caused)} other trains affected"
-    ))
+    _log("override_completed", f"✅ Override COMPLETED: {req.train_id} successfully assigned to P{req.new_platform}, {len(conflicts_caused)} other trains affected", now)
 
     notify_realtime_clients("schedule_update", {"source": "override", "train_id": req.train_id})
 
@@ -291,70 +542,89 @@ def override_schedule(req: OverrideRequest):
         "reason": reason_for_train, 
         "conflicts_caused": len(conflicts_caused),
         "affected_trains": [c["train_id"] for c in conflicts_caused],
-        "updated_schedule": schedule
+        "updated_schedule": state.schedule
     }
 
+def _tail_page(entries: Deque, limit: int, offset: int) -> List:
+    """Page counted back from the newest entry, returned oldest first like the full list"""
+    page = list(itertools.islice(reversed(entries), offset, offset + limit))
+    page.reverse()
+    return page
+
 @app.get("/log")
-def get_logs():
-    return logs
+def get_logs(limit: int = Query(500, ge=1), offset: int = Query(0, ge=0)):
+    """Most recent log entries in chronological order; offset skips the newest ones"""
+    return _tail_page(logs, limit, offset)
 
 @app.get("/optimization-history")
-def get_optimization_history():
+def get_optimization_history(limit: int = Query(500, ge=1), offset: int = Query(0, ge=0)):
     """Get detailed optimization history for analysis"""
-    return optimization_history
+    return _tail_page(optimization_history, limit, offset)
 
 @app.get("/baseline")
 def get_baseline():
     """Get the baseline schedule for comparison"""
-    global baseline_schedule
-    if not baseline_schedule:
-        baseline_schedule = greedy_optimizer(trains, stations, {}, legs_override=train_legs_override)
-    return baseline_schedule
+    with _schedule_lock:
+        if not state.baseline_schedule:
+            state.baseline_schedule = run_greedy_cached({}, legs_override=train_legs_override)
+        return state.baseline_schedule
 
 @app.post("/reset")
 def reset_system():
     """Reset all overrides and regenerate baseline"""
-    global schedule, baseline_schedule, fixed_overrides, logs, optimization_history
-    
-    # Clear all overrides
-    old_overrides = len(fixed_overrides)
-    fixed_overrides = {}
-    
-    # Clear schedules to force regeneration
-    schedule = []
-    baseline_schedule = []
+    with _schedule_lock:
+        # Clear all overrides
+        old_overrides = len(state.fixed_overrides)
+        state.fixed_overrides = {}
+        
+        # Clear schedules to force regeneration
+        state.schedule = []
+        state.baseline_schedule = []
     
     # Clear optimization history
-    optimization_history = []
+    optimization_history.clear()
     
-    logs.append(LogEntry(
-        timestamp=datetime.now(),
-        action="system_reset",
-        details=f"🔄 SYSTEM RESET: Cleared {old_overrides} overrides, regenerating baseline schedule"
-    ))
+    _log("system_reset", f"🔄 SYSTEM RESET: Cleared {old_overrides} overrides, regenerating baseline schedule")
     
     return {"status": "success", "message": "System reset, all overrides cleared"}
 
+# (schedule list, trains_version, pairs, delays) for the live schedule. Every optimizer run
+# rebinds schedule to a new list rather than editing it, so list identity tells whether
+# the cached vector is still current.
+_delay_vector_cache: Optional[tuple] = None
+
+
+def schedule_delays(schedule: List[ScheduleEntry]) -> tuple:
+    """(entry, train) pairs of schedule and their arrival delays in minutes; memoized for the live schedule"""
+    global _delay_vector_cache
+    cached = _delay_vector_cache
+    if cached is not None and cached[0] is schedule and cached[1] == state.trains_version:
+        return cached[2], cached[3]
+    
+    by_id = state.trains_by_id
+    pairs = [(entry, by_id[entry.train_id]) for entry in schedule if entry.train_id in by_id]
+    delays = arrival_delays(pairs)
+    delays.flags.writeable = False  # shared between endpoints
+    if schedule is state.schedule:
+        _delay_vector_cache = (schedule, state.trains_version, pairs, delays)
+    return pairs, delays
+
+
+def _schedule_delay_stats() -> tuple:
+    _, delays = schedule_delays(state.schedule)
+    on_time_trains = int((delays == 0).sum())
+    avg_delay = float(delays.mean()) if delays.size else 0
+    return avg_delay, on_time_trains
+
 @app.get("/stats")
 def get_system_stats():
     """Get system statistics and KPIs"""
-    total_trains = len(trains)
-    active_overrides = len(fixed_overrides)
+    total_trains = len(state.trains)
+    active_overrides = len(state.fixed_overrides)
     total_logs = len(logs)
     
-    # Calculate delays if schedule exists
-    avg_delay = 0
-    on_time_trains = 0
-    if schedule:
-        delays = []
-        for s in schedule:
-            train = next((t for t in trains if t.id == s.train_id), None)
-            if train:
-                delay = max(0.0, (s.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0)
-                delays.append(delay)
-                if delay == 0:
-                    on_time_trains += 1
-        avg_delay = sum(delays) / len(delays) if delays else 0
+    # Delay aggregates only change when the schedule does
+    avg_delay, on_time_trains = _schedule_delay_stats()
     
     return {
         "total_trains": total_trains,
@@ -368,7 +638,7 @@ def get_system_stats():
 @app.get("/stations")
 def get_stations():
     result = []
-    for st in stations.values():
+    for st in state.stations.values():
         meta = station_metadata.get(st.id, {})
         result.append({**st.dict(), **meta})
     return result
@@ -376,59 +646,65 @@ def get_stations():
 @app.post("/simulate-override")
 def simulate_override(req: OverrideRequest):
     """Simulate an override to predict its impact without applying it"""
-    global schedule
     
     # Ensure schedule exists
-    if not schedule:
-        schedule = greedy_optimizer(trains, stations, {})
+    with _schedule_lock:
+        if not state.schedule:
+            state.schedule = run_greedy_cached({})
     
     # Validate platform exists
-    station = stations.get(req.station_id)
+    station = state.stations.get(req.station_id)
     if not station:
         raise HTTPException(status_code=404, detail="Station not found")
         
     if req.new_platform < 1 or req.new_platform > station.platforms:
         raise HTTPException(status_code=400, detail="Invalid platform")
     
-    # Create a temporary override set including the simulation
-    temp_overrides = copy.deepcopy(fixed_overrides)
-    temp_overrides[req.train_id] = req.new_platform
+    cache_key = (
+        state.trains_version, frozenset(state.fixed_overrides.items()), req.train_id, req.station_id, req.new_platform
+    )
+    with _schedule_cache_lock:
+        cached = _simulation_cache.get(cache_key)
+        if cached is not None and cached[0] is state.schedule:
+            _simulation_cache.move_to_end(cache_key)
+            return cached[1]
+
+    # Create a temporary override set including the simulation (values are ints)
+    temp_overrides = {**state.fixed_overrides, req.train_id: req.new_platform}
     
-    # Generate simulated schedule
-    simulated_schedule = greedy_optimizer(trains, stations, temp_overrides)
+    # Generate simulated schedule with the same legs /override applies, so applying it reuses this run
+    simulated_schedule = run_greedy_cached(temp_overrides, legs_override=train_legs_override)
     
     # Calculate impact metrics
     conflicts_predicted = []
-    for sim_entry in simulated_schedule:
-        current_entry = next((s for s in schedule if s.train_id == sim_entry.train_id), None)
+    current_by_id = index_by_train(state.schedule)
+    for sim_entry, current_entry in changed_entries(state.schedule, simulated_schedule, by_station=False):
+        # Trains whose platform or arrival would move
         if current_entry and sim_entry.train_id != req.train_id:
-            # Check if this train would be affected
-            if (current_entry.assigned_platform != sim_entry.assigned_platform or 
-                current_entry.actual_arrival != sim_entry.actual_arrival):
-                train = next((t for t in trains if t.id == sim_entry.train_id), None)
-                if train:
-                    current_delay = max(0.0, (current_entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0)
-                    sim_delay = max(0.0, (sim_entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0)
-                    conflicts_predicted.append({
-                        "train_id": sim_entry.train_id,
-                        "current_platform": current_entry.assigned_platform,
-                        "predicted_platform": sim_entry.assigned_platform,
-                        "current_delay": current_delay,
-                        "predicted_delay": sim_delay,
-                        "delay_change": sim_delay - current_delay
-                    })
+            train = state.trains_by_id.get(sim_entry.train_id)
+            if train:
+                current_delay = max(0.0, (current_entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0)
+                sim_delay = max(0.0, (sim_entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0)
+                conflicts_predicted.append({
+                    "train_id": sim_entry.train_id,
+                    "current_platform": current_entry.assigned_platform,
+                    "predicted_platform": sim_entry.assigned_platform,
+                    "current_delay": current_delay,
+                    "predicted_delay": sim_delay,
+                    "delay_change": sim_delay - current_delay
+                })
     
     # Calculate total delay impact
     total_current_delay = sum(c["current_delay"] for c in conflicts_predicted)
     total_predicted_delay = sum(c["predicted_delay"] for c in conflicts_predicted)
     
     # Get the specific train's impact
-    target_train_current = next((s for s in schedule if s.train_id == req.train_id), None)
-    target_train_simulated = next((s for s in simulated_schedule if s.train_id == req.train_id), None)
+    target_train_current = current_by_id.get(req.train_id)
+    target_train_simulated = index_by_train(simulated_schedule).get(req.train_id)
     
     target_impact = None
     if target_train_current and target_train_simulated:
-        train = next((t for t in trains if t.id == req.train_id), None)
+        train = state.trains_by_id.get(req.train_id)
         if train:
             current_delay = max(0.0, (target_train_current.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0)
             predicted_delay = max(0.0, (target_train_simulated.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0)
@@ -438,14 +714,30 @@ def simulate_override(req: OverrideRequest):
                 "delay_change": predicted_delay - current_delay
             }
     
-    return {
+    # Trains currently holding the requested platform while the target would be there
+    platform_occupants = []
+    target_at_station = index_by_train_station(state.schedule).get((req.train_id, req.station_id))
+    if target_at_station:
+        slots = platform_intervals(state.schedule).get((req.station_id, req.new_platform), [])
+        platform_occupants = [
+            slot[2] for slot in overlapping_slots(slots, target_at_station.actual_arrival, target_at_station.actual_departure)
+            if slot[2] != req.train_id
+        ]
+
+    response = {
         "status": "simulation_complete",
         "schedule": simulated_schedule,
         "target_train_impact": target_impact,
+        "platform_occupants": platform_occupants,
         "conflicts_predicted": conflicts_predicted,
         "total_delay_impact": total_predicted_delay - total_current_delay,
         "affected_trains_count": len(conflicts_predicted)
     }
+    with _schedule_cache_lock:
+        _simulation_cache[cache_key] = (state.schedule, response)
+        if len(_simulation_cache) > SIMULATION_CACHE_SIZE:
+            _simulation_cache.popitem(last=False)
+    return response
 
 # Delay injection models
 class DelayInjectionRequest(BaseModel):
@@ -461,110 +753,91 @@ class DelayInjectionResponse(BaseModel):
     affected_trains: List[str]
     total_delay_impact: float
 
-# Global delay tracking
-active_delays: Dict[str, Dict] = {}
-
 # WebSocket connection management
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Set[WebSocket] = set()
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        # A failed broadcast may already have dropped this socket
+        self.active_connections.discard(websocket)
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
 
     async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except:
-                # Remove broken connections
-                self.active_connections.remove(connection)
+        # Send to a snapshot concurrently, so sockets joining or leaving mid-send don't
+        # disturb iteration and one slow client doesn't hold up the rest
+        connections = list(self.active_connections)
+        results = await asyncio.gather(
+            *(connection.send_text(message) for connection in connections),
+            return_exceptions=True,
+        )
+        # Remove broken connections
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.active_connections.discard(connection)
 
 manager = ConnectionManager()
 
 # Train movement tracking
+@dataclass(slots=True)
 class TrainMovement:
-    def __init__(self, train_id: str, from_station: str, to_station: str, 
-                 start_time: datetime, end_time: datetime, status: str = "waiting"):
-        self.train_id = train_id
-        self.from_station = from_station
-        self.to_station = to_station
-        self.start_time = start_time
-        self.end_time = end_time
-        self.status = status  # "waiting", "moving", "arrived", "delayed"
-        self.progress = 0.0  # 0.0 to 1.0
-        self.current_position = from_station
-        self.delay_minutes = 0
-
-# Global train movements tracking
-train_movements: Dict[str, TrainMovement] = {}
-movement_thread = None
-movement_running = False
-
-# Track occupancy tracking
-track_occupancy: Dict[str, Dict] = {}  # track_id -> {train_id, start_time, end_time}
-conflict_log: List[Dict] = []
+    train_id: str
+    from_station: str
+    to_station: str
+    start_time: datetime
+    end_time: datetime
+    status: str = "waiting"  # "waiting", "moving", "arrived", "delayed"
+    progress: float = 0.0  # 0.0 to 1.0
+    delay_minutes: int = 0
 
 @app.post("/inject-delay", response_model=DelayInjectionResponse)
-def inject_delay(req: DelayInjectionRequest):
+async def inject_delay(req: DelayInjectionRequest):
     """Inject a delay into the system and re-optimize"""
-    global schedule, active_delays
+    now = datetime.now()
     
     # Validate train exists
-    train = next((t for t in trains if t.id == req.train_id), None)
+    train = state.trains_by_id.get(req.train_id)
     if not train:
         raise HTTPException(status_code=404, detail="Train not found")
     
     # Store the delay
-    active_delays[req.train_id] = {
+    state.active_delays = {**state.active_delays, req.train_id: {
         "delay_type": req.delay_type,
         "delay_minutes": req.delay_minutes,
         "reason": req.reason or f"{req.delay_type} delay",
-        "timestamp": datetime.now()
-    }
+        "timestamp": now
+    }}
     
     # Log the delay injection
-    logs.append(LogEntry(
-        timestamp=datetime.now(),
-        action="delay_injected",
-        details=f"🚨 DELAY INJECTED: {req.train_id} - {req.delay_type} delay of {req.delay_minutes} minutes. Reason: {req.reason or 'System delay'}"
-    ))
+    _log("delay_injected", f"🚨 DELAY INJECTED: {req.train_id} - {req.delay_type} delay of {req.delay_minutes} minutes. Reason: {req.reason or 'System delay'}", now)
     
     # Re-optimize with delays
-    old_schedule = copy.deepcopy(schedule)
-    schedule = greedy_optimizer_with_delays(trains, stations, fixed_overrides, active_delays)
+    old_schedule = state.schedule
+    await run_in_threadpool(run_greedy_recompute, True)
     
     # Calculate affected trains
     affected_trains = []
     total_delay_impact = 0
     
-    for new_entry in schedule:
-        old_entry = next((s for s in old_schedule if s.train_id == new_entry.train_id), None)
+    for new_entry, old_entry in changed_entries(old_schedule, state.schedule, by_station=False):
         if old_entry and new_entry.train_id != req.train_id:
-            if (old_entry.actual_arrival != new_entry.actual_arrival or 
-                old_entry.assigned_platform != new_entry.assigned_platform):
-                affected_trains.append(new_entry.train_id)
-                
-                # Calculate delay impact
-                train_obj = next((t for t in trains if t.id == new_entry.train_id), None)
-                if train_obj:
-                    old_delay = max(0.0, (old_entry.actual_arrival - train_obj.scheduled_arrival).total_seconds() / 60.0)
-                    new_delay = max(0.0, (new_entry.actual_arrival - train_obj.scheduled_arrival).total_seconds() / 60.0)
-                    total_delay_impact += (new_delay - old_delay)
+            affected_trains.append(new_entry.train_id)
+
+            # Calculate delay impact
+            train_obj = state.trains_by_id.get(new_entry.train_id)
+            if train_obj:
+                old_delay = max(0.0, (old_entry.actual_arrival - train_obj.scheduled_arrival).total_seconds() / 60.0)
+                new_delay = max(0.0, (new_entry.actual_arrival - train_obj.scheduled_arrival).total_seconds() / 60.0)
+                total_delay_impact += (new_delay - old_delay)
     
     # Log optimization results
-    logs.append(LogEntry(
-        timestamp=datetime.now(),
-        action="delay_optimization",
-        details=f"🔄 DELAY OPTIMIZATION: {req.train_id} delay caused {len(affected_trains)} trains to be re-optimized. Total delay impact: +{total_delay_impact:.1f} minutes"
-    ))
+    _log("delay_optimization", f"🔄 DELAY OPTIMIZATION: {req.train_id} delay caused {len(affected_trains)} trains to be re-optimized. Total delay impact: +{total_delay_impact:.1f} minutes", now)
 
     notify_realtime_clients("schedule_update", {"source": "inject_delay", "train_id": req.train_id})
 
@@ -579,24 +852,20 @@ def inject_delay(req: DelayInjectionRequest):
 @app.get("/active-delays")
 def get_active_delays():
     """Get all currently active delays"""
-    return active_delays
+    return state.active_delays
 
 @app.delete("/clear-delays")
 def clear_all_delays():
     """Clear all active delays and re-optimize"""
-    global active_delays, schedule
     
-    old_delay_count = len(active_delays)
-    active_delays = {}
-    
-    # Re-optimize without delays
-    schedule = greedy_optimizer(trains, stations, fixed_overrides)
+    with _schedule_lock:
+        old_delay_count = len(state.active_delays)
+        state.active_delays = {}
+        
+        # Re-optimize without delays
+        run_greedy_recompute(False)
     
-    logs.append(LogEntry(
-        timestamp=datetime.now(),
-        action="delays_cleared",
-        details=f"🧹 DELAYS CLEARED: Removed {old_delay_count} active delays. System re-optimized to baseline."
-    ))
+    _log("delays_cleared", f"🧹 DELAYS CLEARED: Removed {old_delay_count} active delays. System re-optimized to baseline.")
 
     notify_realtime_clients("schedule_update", {"source": "clear_delays", "cleared_count": old_delay_count})
 
@@ -604,12 +873,12 @@ def clear_all_delays():
 
 # Conflict injection endpoint
 @app.post("/inject-conflict")
-def inject_conflict():
+async def inject_conflict():
     """Inject a conflict by forcing two trains to the same platform"""
-    global schedule, fixed_overrides
+    now = datetime.now()
     
     # Find two trains that can be forced to the same platform
-    available_trains = [t for t in trains if t.id not in fixed_overrides]
+    available_trains = [t for t in state.trains if t.id not in state.fixed_overrides]
     if len(available_trains) < 2:
         return {
             "status": "conflict_rejected",
@@ -625,45 +894,32 @@ def inject_conflict():
     platform = 1
     
     # Store the conflict
-    old_overrides = copy.deepcopy(fixed_overrides)
-    fixed_overrides[train1.id] = platform
-    fixed_overrides[train2.id] = platform
+    state.fixed_overrides = {**state.fixed_overrides, train1.id: platform, train2.id: platform}
     
     # Log the conflict injection
-    logs.append(LogEntry(
-        timestamp=datetime.now(),
-        action="conflict_injected",
-        details=f"⚠️ CONFLICT INJECTED: Forced {train1.id} and {train2.id} to Platform {platform} at {station_id}"
-    ))
+    _log("conflict_injected", f"⚠️ CONFLICT INJECTED: Forced {train1.id} and {train2.id} to Platform {platform} at {station_id}", now)
     
     # Re-optimize with the conflict
-    old_schedule = copy.deepcopy(schedule)
-    schedule = greedy_optimizer(trains, stations, fixed_overrides)
+    old_schedule = state.schedule
+    await run_in_threadpool(run_greedy_recompute, False)
     
     # Calculate impact
     affected_trains = []
     total_delay_impact = 0
     
-    for new_entry in schedule:
-        old_entry = next((s for s in old_schedule if s.train_id == new_entry.train_id), None)
-        if old_entry and new_entry.train_id in [train1.id, train2.id]:
-            if (old_entry.actual_arrival != new_entry.actual_arrival or 
-                old_entry.assigned_platform != new_entry.assigned_platform):
-                affected_trains.append(new_entry.train_id)
-                
-                # Calculate delay impact
-                train_obj = next((t for t in trains if t.id == new_entry.train_id), None)
-                if train_obj:
-                    old_delay = max(0.0, (old_entry.actual_arrival - train_obj.scheduled_arrival).total_seconds() / 60.0)
-                    new_delay = max(0.0, (new_entry.actual_arrival - train_obj.scheduled_arrival).total_seconds() / 60.0)
-                    total_delay_impact += (new_delay - old_delay)
+    for new_entry, old_entry in changed_entries(old_schedule, state.schedule, by_station=False):
+        if old_entry and new_entry.train_id in {train1.id, train2.id}:
+            affected_trains.append(new_entry.train_id)
+
+            # Calculate delay impact
+            train_obj = state.trains_by_id.get(new_entry.train_id)
+            if train_obj:
+                old_delay = max(0.0, (old_entry.actual_arrival - train_obj.scheduled_arrival).total_seconds() / 60.0)
+                new_delay = max(0.0, (new_entry.actual_arrival - train_obj.scheduled_arrival).total_seconds() / 60.0)
+                total_delay_impact += (new_delay - old_delay)
     
     # Log optimization results
-    logs.append(LogEntry(
-        timestamp=datetime.now(),
-        action="conflict_optimization",
-        details=f"🔄 CONFLICT OPTIMIZATION: {train1.id} and {train2.id} conflict caused {len(affected_trains)} trains to be re-optimized. Total delay impact: +{total_delay_impact:.1f} minutes"
-    ))
+    _log("conflict_optimization", f"🔄 CONFLICT OPTIMIZATION: {train1.id} and {train2.id} conflict caused {len(affected_trains)} trains to be re-optimized. Total delay impact: +{total_delay_impact:.1f} minutes", now)
 
     notify_realtime_clients("schedule_update", {"source": "inject_conflict"})
 
@@ -687,16 +943,11 @@ async def websocket_endpoint(websocket: WebSocket):
     await manager.connect(websocket)
     print(f"🔌 WebSocket connected: {len(manager.active_connections)} connections")
     try:
+        # Positions are pushed to every client by _broadcast_train_positions; send the
+        # current snapshot straight away, then only listen so disconnects are noticed
+        await manager.send_personal_message(_train_positions_message(), websocket)
         while True:
-            # Send current train positions
-            positions = get_current_train_positions()
-            message = json.dumps({
-                "type": "train_positions",
-                "data": positions,
-                "timestamp": datetime.now().isoformat()
-            })
-            await manager.send_personal_message(message, websocket)
-            await asyncio.sleep(1)  # Update every second
+            await websocket.receive_text()
     except WebSocketDisconnect:
         manager.disconnect(websocket)
         print(f"🔌 WebSocket disconnected: {len(manager.active_connections)} connections")
@@ -704,254 +955,449 @@ async def websocket_endpoint(websocket: WebSocket):
         print(f"❌ WebSocket error: {e}")
         manager.disconnect(websocket)
 
+def _train_positions_message() -> str:
+    return dumps({
+        "type": "train_positions",
+        "data": get_current_train_positions(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+
+async def _broadcast_train_positions() -> None:
+    """Single producer: compute and serialize positions once per tick for all clients"""
+    while True:
+        await asyncio.sleep(POSITION_BROADCAST_INTERVAL_SECONDS)
+        if not manager.active_connections:
+            continue
+        try:
+            await manager.broadcast(_train_positions_message())
+        except Exception as e:
+            print(f"❌ Position broadcast error: {e}")
+
+
 def get_current_train_positions():
     """Get current positions of all trains"""
-    positions = []
-    current_time = datetime.now()
-    
-    # Debug: Print movement count
-    if len(train_movements) > 0:
-        print(f"🚂 Active movements: {len(train_movements)}")
-    
-    for train_id, movement in train_movements.items():
-        # Calculate progress based on current time
-        if movement.status == "waiting":
-            progress = 0.0
-            position = movement.from_station
-        elif movement.status == "moving":
-            total_duration = (movement.end_time - movement.start_time).total_seconds()
-            elapsed = (current_time - movement.start_time).total_seconds()
-            progress = min(1.0, max(0.0, elapsed / total_duration)) if total_duration > 0 else 0.0
+    with _movements_lock:
+        positions = []
+        current_time = datetime.now()
+    
+        # Debug: Print movement count
+        if VERBOSE_LOGS and state.train_movements:
+            print(f"🚂 Active movements: {len(state.train_movements)}")
+    
+        for train_id, movement in state.train_movements.items():
+            # Calculate progress based on current time
+            if movement.status == "waiting":
+                progress = 0.0
+                position = movement.from_station
+            elif movement.status == "moving":
+                total_duration = (movement.end_time - movement.start_time).total_seconds()
+                elapsed = (current_time - movement.start_time).total_seconds()
+                progress = min(1.0, max(0.0, elapsed / total_duration)) if total_duration > 0 else 0.0
             
-            if progress >= 1.0:
-                movement.status = "arrived"
-                movement.progress = 1.0
+                if progress >= 1.0:
+                    movement.status = "arrived"
+                    movement.progress = 1.0
+                    release_track(train_id)
+                    position = movement.to_station
+                else:
+                    position = f"{movement.from_station}→{movement.to_station}"
+            else:  # arrived
+                progress = 1.0
                 position = movement.to_station
-            else:
-                position = f"{movement.from_station}→{movement.to_station}"
-        else:  # arrived
-            progress = 1.0
-            position = movement.to_station
         
-        positions.append({
-            "train_id": train_id,
-            "from_station": movement.from_station,
-            "to_station": movement.to_station,
-            "current_position": position,
-            "progress": progress,
-            "status": movement.status,
-            "delay_minutes": movement.delay_minutes
-        })
-    
-    return positions
+            positions.append({
+                "train_id": train_id,
+                "from_station": movement.from_station,
+                "to_station": movement.to_station,
+                "current_position": position,
+                "progress": progress,
+                "status": movement.status,
+                "delay_minutes": movement.delay_minutes
+            })
+    
+        return positions
+
+async def _movement_loop() -> None:
+    """Advance train movements on the event loop, waking at the next due transition or on request"""
+    wakeup = _movement_wakeup
+    while True:
+        wakeup.clear()
+        next_event = None
+        try:
+            # Update train movements based on schedule
+            next_event = update_train_movements()
+        except Exception as e:
+            movement_logger.error("Movement simulation error: %s", e)
+        
+        delay = MOVEMENT_MAX_IDLE_SECONDS
+        if next_event is not None:
+            delay = min(delay, (next_event - datetime.now()).total_seconds())
+        try:
+            await asyncio.wait_for(wakeup.wait(), timeout=max(MOVEMENT_MIN_TICK_SECONDS, delay))
+        except asyncio.TimeoutError:
+            pass
+
+
+def wake_movement_simulation() -> None:
+    """Run the movement tick now rather than at its next transition; safe from any thread"""
+    loop, wakeup = _main_loop, _movement_wakeup
+    if loop is not None and wakeup is not None:
+        loop.call_soon_threadsafe(wakeup.set)
+
+
+def movement_simulation_running() -> bool:
+    return _movement_task is not None and not _movement_task.done()
+
 
 def start_train_movement_simulation():
-    """Start the train movement simulation thread"""
-    global movement_running, movement_thread
-    
-    if movement_running:
+    """Start the train movement simulation task; must be called on the event loop"""
+    global _movement_task, _movement_wakeup
+    if movement_simulation_running():
         return
-    
-    movement_running = True
-    
-    def movement_loop():
-        while movement_running:
-            try:
-                # Update train movements based on schedule
-                update_train_movements()
-                time.sleep(1)  # Update every second
-            except Exception as e:
-                print(f"Movement simulation error: {e}")
-                time.sleep(1)
-    
-    movement_thread = threading.Thread(target=movement_loop, daemon=True)
-    movement_thread.start()
+    _movement_wakeup = asyncio.Event()
+    _movement_task = asyncio.create_task(_movement_loop())
+
+
+def stop_train_movement_simulation():
+    """Cancel the train movement simulation task if it is running"""
+    global _movement_task, _movement_wakeup
+    if _movement_task is not None:
+        _movement_task.cancel()
+        _movement_task = None
+        _movement_wakeup = None
+
+# Tracks are keyed internally by from_code * TRACK_KEY_STRIDE + to_code; the
+# "FROM->TO" names only appear in API payloads and conflict records
+TRACK_KEY_STRIDE = 1 << 16
+_station_codes: Dict[str, int] = {}
+_station_ids: List[str] = []
+
+
+def _station_code(station_id: str) -> int:
+    code = _station_codes.get(station_id)
+    if code is None:
+        # Movements may name stations outside the dataset (e.g. a train's destination)
+        code = _station_codes[station_id] = len(_station_ids)
+        _station_ids.append(station_id)
+    return code
+
+
+for _station_id in state.stations:
+    _station_code(_station_id)
+
+
+def _track_key(movement: "TrainMovement") -> int:
+    return _station_code(movement.from_station) * TRACK_KEY_STRIDE + _station_code(movement.to_station)
+
+
+def _track_name(track_key: int) -> str:
+    from_code, to_code = divmod(track_key, TRACK_KEY_STRIDE)
+    return f"{_station_ids[from_code]}->{_station_ids[to_code]}"
+
+
+def mark_track_window_changed(train_id: str) -> None:
+    """Queue a train that started moving, or whose window moved, for the next conflict check"""
+    with _movements_lock:
+        state.track_pending[train_id] = None
+
+
+def _unregister_track(train_id: str) -> Optional[int]:
+    """Drop train_id's window from its track; returns that track, if it had one"""
+    registered = state.train_tracks.pop(train_id, None)
+    if registered is None:
+        return None
+    track_key, start_time, end_time = registered
+    slots = state.track_intervals[track_key]
+    del slots[bisect_left(slots, (start_time, end_time, train_id))]
+    if not slots:
+        del state.track_intervals[track_key]
+    return track_key
+
+
+def _refresh_track_occupancy(track_key: int) -> None:
+    """Occupancy view for the API: the train furthest ahead on the track"""
+    slots = state.track_intervals.get(track_key)
+    if slots:
+        start_time, end_time, train_id = slots[0]
+        state.track_occupancy[_track_name(track_key)] = {'train_id': train_id, 'start_time': start_time, 'end_time': end_time}
+    else:
+        state.track_occupancy.pop(_track_name(track_key), None)
+    state.movements_version += 1
+
+
+def release_track(train_id: str) -> None:
+    """Free the track of a train that has arrived"""
+    with _movements_lock:
+        track_key = _unregister_track(train_id)
+        if track_key is not None:
+            _refresh_track_occupancy(track_key)
+
 
 def detect_track_conflicts():
     """Detect conflicts between trains on the same track"""
-    global track_occupancy, conflict_log, train_movements
-    
-    conflicts = []
-    current_time = datetime.now()
-    
-    # Clear old track occupancy
-    for track_id in list(track_occupancy.keys()):
-        if current_time > track_occupancy[track_id]['end_time']:
-            del track_occupancy[track_id]
     
-    # Check for conflicts in moving trains
-    moving_trains = {tid: movement for tid, movement in train_movements.items() 
-                    if movement.status == "moving"}
-    
-    for train_id, movement in moving_trains.items():
-        # Create track identifier (from_station -> to_station)
-        track_id = f"{movement.from_station}->{movement.to_station}"
+    with _movements_lock:
+        conflicts = []
+        current_time = datetime.now()
+        timestamp = current_time.isoformat()  # shared by every record this pass
+        touched: Set[int] = set()
         
-        if track_id in track_occupancy:
-            # Conflict detected!
-            conflicting_train = track_occupancy[track_id]['train_id']
-            conflicts.append({
-                'track_id': track_id,
-                'train1': train_id,
-                'train2': conflicting_train,
-                'timestamp': current_time.isoformat()
-            })
-            
-            # Log the conflict
-            conflict_log.append({
-                'type': 'track_conflict',
-                'track': track_id,
-                'trains': [train_id, conflicting_train],
-                'timestamp': current_time.isoformat(),
-                'resolved': False
-            })
+        # Expire windows whose end has passed; entries left behind by a reschedule
+        # or an earlier release no longer match the registration and are skipped
+        expiry = state.track_expiry
+        while expiry and expiry[0][0] < current_time:
+            end_time, track_key, train_id = heapq.heappop(expiry)
+            registered = state.train_tracks.get(train_id)
+            if registered is not None and registered[0] == track_key and registered[2] == end_time:
+                _unregister_track(train_id)
+                touched.add(track_key)
+        
+        # Each train is checked once when it enters a track (or is rescheduled) against every
+        # train its window overlaps, then recorded so later arrivals are checked against it
+        pending, state.track_pending = state.track_pending, {}
+        for train_id in pending:
+            released = _unregister_track(train_id)
+            if released is not None:
+                touched.add(released)
+            movement = state.train_movements.get(train_id)
+            if movement is None or movement.status != "moving" or movement.end_time < current_time:
+                continue
             
-            print(f"🚨 CONFLICT DETECTED: {train_id} and {conflicting_train} on track {track_id}")
-        else:
-            # Assign track to this train
-            track_occupancy[track_id] = {
-                'train_id': train_id,
-                'start_time': movement.start_time,
-                'end_time': movement.end_time
-            }
-    
-    return conflicts
+            track_key = _track_key(movement)
+            start_time, end_time = movement.start_time, movement.end_time
+            slots = state.track_intervals.setdefault(track_key, [])
+            track_id = _track_name(track_key)
+            for _, _, conflicting_train in overlapping_slots(slots, start_time, end_time):
+                conflicts.append({
+                    'track_id': track_id,
+                    'train1': train_id,
+                    'train2': conflicting_train,
+                    'timestamp': timestamp
+                })
+                
+                # Log the conflict
+                state.movements_version += 1
+                state.conflict_log.append({
+                    'type': 'track_conflict',
+                    'track': track_id,
+                    'trains': [train_id, conflicting_train],
+                    'timestamp': timestamp,
+                    'resolved': False
+                })
+                
+                movement_logger.info("🚨 CONFLICT DETECTED: %s and %s on track %s", train_id, conflicting_train, track_id)
+            insort(slots, (start_time, end_time, train_id))
+            state.train_tracks[train_id] = (track_key, start_time, end_time)
+            heapq.heappush(expiry, (end_time, track_key, train_id))
+            touched.add(track_key)
+        
+        for track_key in touched:
+            _refresh_track_occupancy(track_key)
+        
+        return conflicts
+
+def peek_track_conflicts() -> List[Tuple[str, str, str]]:
+    """(track, train1, train2) of every conflict the next detect_track_conflicts would report
+
+    Read-only, for the GET endpoints: only the movement tick drains track_pending, so
+    conflicts stay pending until resolve_conflicts has handled them.
+    """
+    with _movements_lock:
+        conflicts = []
+        current_time = datetime.now()
+        slots_by_track: Dict[int, List[Tuple[datetime, datetime, str]]] = {}  # copies the pass would edit
+
+        def track_slots(track_key: int) -> List[Tuple[datetime, datetime, str]]:
+            slots = slots_by_track.get(track_key)
+            if slots is None:
+                # Windows ending before now are expired by the pass before it checks anything
+                slots = [slot for slot in state.track_intervals.get(track_key, ()) if slot[1] >= current_time]
+                slots_by_track[track_key] = slots
+            return slots
+
+        # Same order and bookkeeping as detect_track_conflicts, on copies of the touched tracks
+        registered_by_train = dict(state.train_tracks)
+        for train_id in state.track_pending:
+            registered = registered_by_train.pop(train_id, None)
+            if registered is not None and registered[2] >= current_time:
+                track_key, start_time, end_time = registered
+                slots = track_slots(track_key)
+                del slots[bisect_left(slots, (start_time, end_time, train_id))]
+            movement = state.train_movements.get(train_id)
+            if movement is None or movement.status != "moving" or movement.end_time < current_time:
+                continue
+
+            track_key = _track_key(movement)
+            slots = track_slots(track_key)
+            track_id = _track_name(track_key)
+            for _, _, conflicting_train in overlapping_slots(slots, movement.start_time, movement.end_time):
+                conflicts.append((track_id, train_id, conflicting_train))
+            insort(slots, (movement.start_time, movement.end_time, train_id))
+
+        return conflicts
 
 def resolve_conflicts(conflicts):
     """Resolve conflicts by re-optimizing and reassigning tracks"""
-    global schedule, train_movements
     
-    if not conflicts:
-        return
+    with _movements_lock:
+        if not conflicts:
+            return
     
-    print(f"🔧 Resolving {len(conflicts)} conflicts...")
+        movement_logger.info("🔧 Resolving %d conflicts...", len(conflicts))
+        timestamp = datetime.now().isoformat()
     
-    for conflict in conflicts:
-        train1_id = conflict['train1']
-        train2_id = conflict['train2']
-        track_id = conflict['track']
+        for conflict in conflicts:
+            train1_id = conflict['train1']
+            train2_id = conflict['train2']
+            track_id = conflict['track_id']
         
-        # Get the movements
-        movement1 = train_movements.get(train1_id)
-        movement2 = train_movements.get(train2_id)
+            # Get the movements
+            movement1 = state.train_movements.get(train1_id)
+            movement2 = state.train_movements.get(train2_id)
         
-        if not movement1 or not movement2:
-            continue
+            if not movement1 or not movement2:
+                continue
         
-        # Determine which train has higher priority (earlier start time)
-        if movement1.start_time < movement2.start_time:
-            # Train1 has priority, delay Train2
-            delay_minutes = 5  # 5 minute delay
-            movement2.start_time += timedelta(minutes=delay_minutes)
-            movement2.end_time += timedelta(minutes=delay_minutes)
-            movement2.delay_minutes += delay_minutes
+            # Determine which train has higher priority (earlier start time)
+            if movement1.start_time < movement2.start_time:
+                # Train1 has priority, delay Train2
+                delay_minutes = 5  # 5 minute delay
+                movement2.start_time += timedelta(minutes=delay_minutes)
+                movement2.end_time += timedelta(minutes=delay_minutes)
+                movement2.delay_minutes += delay_minutes
+                mark_track_window_changed(train2_id)
             
-            print(f"⏰ Delayed {train2_id} by {delay_minutes} minutes due to conflict with {train1_id}")
+                movement_logger.info("⏰ Delayed %s by %d minutes due to conflict with %s", train2_id, delay_minutes, train1_id)
             
-            # Log the resolution
-            conflict_log.append({
-                'type': 'conflict_resolved',
-                'track': track_id,
-                'delayed_train': train2_id,
-                'priority_train': train1_id,
-                'delay_minutes': delay_minutes,
-                'timestamp': datetime.now().isoformat()
-            })
-        else:
-            # Train2 has priority, delay Train1
-            delay_minutes = 5
-            movement1.start_time += timedelta(minutes=delay_minutes)
-            movement1.end_time += timedelta(minutes=delay_minutes)
-            movement1.delay_minutes += delay_minutes
+                # Log the resolution
+                state.movements_version += 1
+                state.conflict_log.append({
+                    'type': 'conflict_resolved',
+                    'track': track_id,
+                    'delayed_train': train2_id,
+                    'priority_train': train1_id,
+                    'delay_minutes': delay_minutes,
+                    'timestamp': timestamp
+                })
+            else:
+                # Train2 has priority, delay Train1
+                delay_minutes = 5
+                movement1.start_time += timedelta(minutes=delay_minutes)
+                movement1.end_time += timedelta(minutes=delay_minutes)
+                movement1.delay_minutes += delay_minutes
+                mark_track_window_changed(train1_id)
             
-            print(f"⏰ Delayed {train1_id} by {delay_minutes} minutes due to conflict with {train2_id}")
+                movement_logger.info("⏰ Delayed %s by %d minutes due to conflict with %s", train1_id, delay_minutes, train2_id)
             
-            # Log the resolution
-            conflict_log.append({
-                'type': 'conflict_resolved',
-                'track': track_id,
-                'delayed_train': train1_id,
-                'priority_train': train2_id,
-                'delay_minutes': delay_minutes,
-                'timestamp': datetime.now().isoformat()
-            })
+                # Log the resolution
+                state.movements_version += 1
+                state.conflict_log.append({
+                    'type': 'conflict_resolved',
+                    'track': track_id,
+                    'delayed_train': train1_id,
+                    'priority_train': train2_id,
+                    'delay_minutes': delay_minutes,
+                    'timestamp': timestamp
+                })
 
-def update_train_movements():
-    """Update train movements based on current schedule"""
-    global train_movements, schedule, trains
-    
-    current_time = datetime.now()
-    
-    # Clear old movements
-    to_remove = []
-    for train_id, movement in train_movements.items():
-        if movement.status == "arrived" and (current_time - movement.end_time).total_seconds() > 300:  # 5 minutes
-            to_remove.append(train_id)
-    
-    for train_id in to_remove:
-        del train_movements[train_id]
-    
-    # Create movements for all trains in schedule
-    for entry in schedule:
-        train_id = entry.train_id
-        train = next((t for t in trains if t.id == train_id), None)
-        if not train:
-            continue
+def update_train_movements() -> Optional[datetime]:
+    """Update train movements based on current schedule; returns when the next transition is due"""
+    
+    with _movements_lock:
+        current_time = datetime.now()
+    
+        # Clear old movements
+        to_remove = []
+        for train_id, movement in state.train_movements.items():
+            if movement.status == "arrived" and (current_time - movement.end_time).total_seconds() > 300:  # 5 minutes
+                to_remove.append(train_id)
+    
+        for train_id in to_remove:
+            del state.train_movements[train_id]
+            release_track(train_id)
+    
+        # Create movements for all trains in schedule
+        upcoming: List[datetime] = []
+        for entry in state.schedule:
+            train_id = entry.train_id
+            train = state.trains_by_id.get(train_id)
+            if not train:
+                continue
         
-        arrival_time = entry.actual_arrival
-        departure_time = entry.actual_departure
+            arrival_time = entry.actual_arrival
+            departure_time = entry.actual_departure
         
-        # Create or update movement for this train
-        if train_id not in train_movements:
-            # Create new movement
-            if current_time < arrival_time:
-                # Train hasn't arrived yet
-                train_movements[train_id] = TrainMovement(
-                    train_id=train_id,
-                    from_station=train.origin,
-                    to_station=entry.station_id,
-                    start_time=arrival_time - timedelta(minutes=15),  # 15 min journey
-                    end_time=arrival_time,
-                    status="moving"
-                )
-            elif current_time >= arrival_time and current_time <= departure_time:
-                # Train is at station
-                train_movements[train_id] = TrainMovement(
-                    train_id=train_id,
-                    from_station=entry.station_id,
-                    to_station=train.destination,
-                    start_time=departure_time,
-                    end_time=departure_time + timedelta(minutes=15),
-                    status="waiting"
-                )
+            # Create or update movement for this train
+            if train_id not in state.train_movements:
+                # Create new movement
+                if current_time < arrival_time:
+                    # Train hasn't arrived yet
+                    state.train_movements[train_id] = TrainMovement(
+                        train_id=train_id,
+                        from_station=train.origin,
+                        to_station=entry.station_id,
+                        start_time=arrival_time - timedelta(minutes=15),  # 15 min journey
+                        end_time=arrival_time,
+                        status="moving"
+                    )
+                    mark_track_window_changed(train_id)
+                elif current_time >= arrival_time and current_time <= departure_time:
+                    # Train is at station
+                    state.train_movements[train_id] = TrainMovement(
+                        train_id=train_id,
+                        from_station=entry.station_id,
+                        to_station=train.destination,
+                        start_time=departure_time,
+                        end_time=departure_time + timedelta(minutes=15),
+                        status="waiting"
+                    )
+                else:
+                    # Train should be moving to next station
+                    state.train_movements[train_id] = TrainMovement(
+                        train_id=train_id,
+                        from_station=entry.station_id,
+                        to_station=train.destination,
+                        start_time=departure_time,
+                        end_time=departure_time + timedelta(minutes=15),
+                        status="moving"
+                    )
+                    mark_track_window_changed(train_id)
             else:
-                # Train should be moving to next station
-                train_movements[train_id] = TrainMovement(
-                    train_id=train_id,
-                    from_station=entry.station_id,
-                    to_station=train.destination,
-                    start_time=departure_time,
-                    end_time=departure_time + timedelta(minutes=15),
-                    status="moving"
-                )
-        else:
-            # Update existing movement
-            movement = train_movements[train_id]
+                # Update existing movement
+                movement = state.train_movements[train_id]
             
-            if movement.status == "waiting" and current_time >= departure_time:
-                movement.status = "moving"
-                movement.start_time = departure_time
-                movement.end_time = departure_time + timedelta(minutes=15)
-            elif movement.status == "moving":
-                # Check if journey is complete
-                if current_time >= movement.end_time:
-                    movement.status = "arrived"
-                    movement.progress = 1.0
+                if movement.status == "waiting" and current_time >= departure_time:
+                    movement.status = "moving"
+                    movement.start_time = departure_time
+                    movement.end_time = departure_time + timedelta(minutes=15)
+                    mark_track_window_changed(train_id)
+                elif movement.status == "moving":
+                    # Check if journey is complete
+                    if current_time >= movement.end_time:
+                        movement.status = "arrived"
+                        movement.progress = 1.0
+                        release_track(train_id)
+            
+            if state.train_movements[train_id].status == "waiting":
+                upcoming.append(departure_time)
     
-    # Detect and resolve conflicts
-    conflicts = detect_track_conflicts()
-    if conflicts:
-        resolve_conflicts(conflicts)
+        # Detect and resolve conflicts
+        conflicts = detect_track_conflicts()
+        if conflicts:
+            resolve_conflicts(conflicts)
+        
+        # Trains delayed by the resolution are queued again; re-check them on the next tick
+        if state.track_pending:
+            return current_time
+        
+        # Departures are collected above; arrivals and clean-ups follow from the movement times
+        for movement in state.train_movements.values():
+            if movement.status == "moving":
+                upcoming.append(movement.end_time)
+            elif movement.status == "arrived":
+                upcoming.append(movement.end_time + timedelta(seconds=300))
+        return min(upcoming, default=None)
 
 @app.get("/train-positions")
 def get_train_positions():
@@ -959,93 +1405,107 @@ def get_train_positions():
     return get_current_train_positions()
 
 @app.post("/start-movement-simulation")
-def start_simulation():
+async def start_simulation():
     """Start the train movement simulation"""
-    global movement_running
-    if not movement_running:
+    if not movement_simulation_running():
         start_train_movement_simulation()
         print("🚂 Train movement simulation started")
     return {"status": "success", "message": "Train movement simulation started"}
 
 @app.post("/stop-movement-simulation")
-def stop_simulation():
+async def stop_simulation():
     """Stop the train movement simulation"""
-    global movement_running
-    movement_running = False
+    stop_train_movement_simulation()
     return {"status": "success", "message": "Train movement simulation stopped"}
 
 @app.post("/create-test-movements")
 def create_test_movements():
     """Create some test train movements for demonstration"""
-    global train_movements
-    current_time = datetime.now()
+    with _movements_lock:
+        current_time = datetime.now()
     
-    # Create test movements for all trains in schedule
-    for entry in schedule[:3]:  # Only first 3 trains for demo
-        train_id = entry.train_id
-        train = next((t for t in trains if t.id == train_id), None)
-        if train:
-            # Create a movement that starts now and ends in 2 minutes
-            train_movements[train_id] = TrainMovement(
-                train_id=train_id,
-                from_station=entry.station_id,
-                to_station=train.destination,
-                start_time=current_time,
-                end_time=current_time + timedelta(minutes=2),
-                status="moving"
-            )
+        # Create test movements for all trains in schedule
+        for entry in state.schedule[:3]:  # Only first 3 trains for demo
+            train_id = entry.train_id
+            train = state.trains_by_id.get(train_id)
+            if train:
+                # Create a movement that starts now and ends in 2 minutes
+                state.train_movements[train_id] = TrainMovement(
+                    train_id=train_id,
+                    from_station=entry.station_id,
+                    to_station=train.destination,
+                    start_time=current_time,
+                    end_time=current_time + timedelta(minutes=2),
+                    status="moving"
+                )
+                mark_track_window_changed(train_id)
+        wake_movement_simulation()
     
-    return {"status": "success", "message": f"Created {len(train_movements)} test movements"}
+        return {"status": "success", "message": f"Created {len(state.train_movements)} test movements"}
 
 @app.post("/force-conflict")
 def force_conflict():
     """Force a conflict by putting two trains on the same track"""
-    global train_movements
-    current_time = datetime.now()
-    
-    # Get first two trains from schedule
-    if len(schedule) < 2:
-        return {"status": "error", "message": "Need at least 2 trains to create conflict"}
-    
-    train1_entry = schedule[0]
-    train2_entry = schedule[1]
-    
-    # Create movements for both trains on the same track
-    train_movements[train1_entry.train_id] = TrainMovement(
-        train_id=train1_entry.train_id,
-        from_station=train1_entry.station_id,
-        to_station="SC",  # Force same destination
-        start_time=current_time,
-        end_time=current_time + timedelta(minutes=2),
-        status="moving"
-    )
+    with _movements_lock:
+        current_time = datetime.now()
+    
+        # Get first two trains from schedule
+        if len(state.schedule) < 2:
+            return {"status": "error", "message": "Need at least 2 trains to create conflict"}
+    
+        train1_entry = state.schedule[0]
+        train2_entry = state.schedule[1]
+    
+        # Create movements for both trains on the same track
+        state.train_movements[train1_entry.train_id] = TrainMovement(
+            train_id=train1_entry.train_id,
+            from_station=train1_entry.station_id,
+            to_station="SC",  # Force same destination
+            start_time=current_time,
+            end_time=current_time + timedelta(minutes=2),
+            status="moving"
+        )
     
-    train_movements[train2_entry.train_id] = TrainMovement(
-        train_id=train2_entry.train_id,
-        from_station=train2_entry.station_id,
-        to_station="SC",  # Force same destination
-        start_time=current_time,
-        end_time=current_time + timedelta(minutes=2),
-        status="moving"
-    )
+        state.train_movements[train2_entry.train_id] = TrainMovement(
+            train_id=train2_entry.train_id,
+            from_station=train2_entry.station_id,
+            to_station="SC",  # Force same destination
+            start_time=current_time,
+            end_time=current_time + timedelta(minutes=2),
+            status="moving"
+        )
+        mark_track_window_changed(train1_entry.train_id)
+        mark_track_window_changed(train2_entry.train_id)
+        wake_movement_simulation()
     
-    return {"status": "success", "message": f"Forced conflict between {train1_entry.train_id} and {train2_entry.train_id}"}
+        return {"status": "success", "message": f"Forced conflict between {train1_entry.train_id} and {train2_entry.train_id}"}
 
 @app.get("/conflicts")
-def get_conflicts():
+def get_conflicts(request: Request, response: Response):
     """Get current conflicts, detailed schedule conflicts, and conflict log"""
-    track_conflicts = detect_track_conflicts()
+    with _movements_lock:
+        track_conflicts = peek_track_conflicts()
+        movements_version = state.movements_version
+        conflict_log = _tail_page(state.conflict_log, 10, 0)
+        track_occupancy = dict(state.track_occupancy)
+    schedule = state.schedule
+    etag = _etag(state.trains_version, schedule_fingerprint(schedule), movements_version, len(track_conflicts))
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    response.headers["ETag"] = etag
+
     detailed_conflicts = []
     impact: Dict = {}
     if schedule:
-        conflicts_list, impact = detect_conflicts(trains, stations, schedule)
+        conflicts_list, impact = detect_conflicts_cached(schedule)
         detailed_conflicts = [conflict.dict() for conflict in conflicts_list]
 
     return {
         "active_conflicts": len(track_conflicts),
         "total_count": len(detailed_conflicts),
         "conflicts": detailed_conflicts,
-        "conflict_log": conflict_log[-10:],
+        "conflict_log": conflict_log,
         "track_occupancy": track_occupancy,
         "impact": impact,
         "by_severity": impact.get("by_severity", {}),
@@ -1055,31 +1515,50 @@ def get_conflicts():
 @app.get("/track-status")
 def get_track_status():
     """Get current track status and occupancy"""
-    return {
-        "track_occupancy": track_occupancy,
-        "active_movements": len(train_movements),
-        "conflicts_detected": len(detect_track_conflicts())
-    }
+    with _movements_lock:
+        return {
+            "track_occupancy": dict(state.track_occupancy),
+            "active_movements": len(state.train_movements),
+            "conflicts_detected": len(peek_track_conflicts())
+        }
 
 # ==================== ADVANCED FEATURES ====================
 
+def _evaluate_alternative(train_id: str, platform: int) -> Optional[tuple]:
+    """Conflicts and impact with train_id fixed to platform on top of the live overrides, None on failure"""
+    alt_overrides = {**state.fixed_overrides, train_id: platform}
+    try:
+        if state.optimizer_settings.mode == "ilp":
+            alt_schedule = ilp_optimizer(
+                state.trains, state.stations, alt_overrides, state.active_delays, state.optimizer_settings
+            )
+        else:
+            alt_schedule = run_greedy_cached(alt_overrides)
+        return detect_conflicts_cached(alt_schedule)
+    except Exception as e:
+        logger.error(f"Error evaluating alternative platform {platform}: {e}")
+        return None
+
+
 @app.post("/feasibility", response_model=FeasibilityResponse)
 def check_feasibility(req: FeasibilityRequest):
     """
     Check feasibility of a proposed override before applying it
     Simulates the override and returns safety/impact assessment
     """
-    global schedule, trains, stations, fixed_overrides, active_delays
     
     # Ensure schedule exists
-    if not schedule:
-        if optimizer_settings.mode == "ilp":
-            schedule = ilp_optimizer(trains, stations, fixed_overrides, active_delays, optimizer_settings)
-        else:
-            schedule = greedy_optimizer(trains, stations, fixed_overrides)
+    with _schedule_lock:
+        if not state.schedule:
+            if state.optimizer_settings.mode == "ilp":
+                state.schedule = ilp_optimizer(
+                    state.trains, state.stations, state.fixed_overrides, state.active_delays, state.optimizer_settings
+                )
+            else:
+                state.schedule = greedy_optimizer(state.trains, state.stations, state.fixed_overrides)
     
     # Validate platform exists
-    station = stations.get(req.station_id)
+    station = state.stations.get(req.station_id)
     if not station:
         raise HTTPException(status_code=404, detail="Station not found")
         
@@ -1087,75 +1566,62 @@ def check_feasibility(req: FeasibilityRequest):
         raise HTTPException(status_code=400, detail="Invalid platform")
     
     # Create temporary override set including the proposed change
-    temp_overrides = copy.deepcopy(fixed_overrides)
-    temp_overrides[req.train_id] = req.new_platform
+    temp_overrides = {**state.fixed_overrides, req.train_id: req.new_platform}
     
     # Generate simulated schedule
-    if optimizer_settings.mode == "ilp":
-        simulated_schedule = ilp_optimizer(trains, stations, temp_overrides, active_delays, optimizer_settings)
+    if state.optimizer_settings.mode == "ilp":
+        simulated_schedule = ilp_optimizer(
+            state.trains, state.stations, temp_overrides, state.active_delays, state.optimizer_settings
+        )
     else:
-        simulated_schedule = greedy_optimizer(trains, stations, temp_overrides)
+        simulated_schedule = greedy_optimizer(state.trains, state.stations, temp_overrides)
     
     # Detect conflicts in both current and simulated schedules
-    current_conflicts_list, current_impact = detect_conflicts(trains, stations, schedule)
-    simulated_conflicts, simulated_impact = detect_conflicts(trains, stations, simulated_schedule)
+    current_conflicts_list, current_impact = detect_conflicts_cached(state.schedule)
+    simulated_conflicts, simulated_impact = detect_conflicts_cached(simulated_schedule)
     
     # Calculate impact metrics
     conflicts_before = len(current_conflicts_list)
     conflicts_after = len(simulated_conflicts)
     safety_score = simulated_impact.get("safety_score", 0.8)
     
-    # Calculate delay impact
-    current_delays = {}
-    simulated_delays = {}
-    
-    for entry in schedule:
-        train = next((t for t in trains if t.id == entry.train_id), None)
-        if train:
-            delay = max(0.0, (entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0)
-            current_delays[entry.train_id] = delay
-    
-    for entry in simulated_schedule:
-        train = next((t for t in trains if t.id == entry.train_id), None)
-        if train:
-            delay = max(0.0, (entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0)
-            simulated_delays[entry.train_id] = delay
+    # Calculate delay impact (a train's last leg wins, as each leg overwrites the previous)
+    current_pairs, current_vector = schedule_delays(state.schedule)
+    simulated_pairs, simulated_vector = schedule_delays(simulated_schedule)
+    current_delays = dict(zip((entry.train_id for entry, _ in current_pairs), current_vector.tolist()))
+    simulated_delays = dict(zip((entry.train_id for entry, _ in simulated_pairs), simulated_vector.tolist()))
     
     total_delay_change = sum(simulated_delays.values()) - sum(current_delays.values())
     
-    # Find affected trains
-    affected_trains = []
-    for train_id in set(current_delays.keys()) | set(simulated_delays.keys()):
-        current_delay = current_delays.get(train_id, 0)
-        simulated_delay = simulated_delays.get(train_id, 0)
-        if abs(simulated_delay - current_delay) > 1:  # More than 1 minute change
-            affected_trains.append(train_id)
+    # Find affected trains (more than 1 minute change), in schedule order
+    affected_trains = [
+        train_id for train_id in {**current_delays, **simulated_delays}
+        if abs(simulated_delays.get(train_id, 0) - current_delays.get(train_id, 0)) > 1
+    ]
+    
+    # Generate alternatives; a conflict-free proposal leaves nothing to improve on
+    alt_platforms = [p for p in range(1, station.platforms + 1) if p != req.new_platform] if conflicts_after else []
+    workers = min(len(alt_platforms), os.cpu_count() or 1)
+    if state.optimizer_settings.mode == "ilp" and workers > 1:
+        # The solves are independent and run in solver subprocesses, so threads overlap them
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(lambda platform: _evaluate_alternative(req.train_id, platform), alt_platforms))
+    else:
+        outcomes = [_evaluate_alternative(req.train_id, platform) for platform in alt_platforms]
     
-    # Generate alternatives
     alternatives = []
-    for platform in range(1, station.platforms + 1):
-        if platform != req.new_platform:
-            # Check if this platform would be better
-            alt_temp_overrides = copy.deepcopy(fixed_overrides)
-            alt_temp_overrides[req.train_id] = platform
-            
-            try:
-                if optimizer_settings.mode == "ilp":
-                    alt_schedule = ilp_optimizer(trains, stations, alt_temp_overrides, active_delays, optimizer_settings)
-                else:
-                    alt_schedule = greedy_optimizer(trains, stations, alt_temp_overrides)
-                
-                alt_conflicts, alt_impact = detect_conflicts(trains, stations, alt_schedule)
-                
-                if len(alt_conflicts) <= conflicts_after:
-                    alternatives.append({
-                        "platform": platform,
-                        "conflicts": len(alt_conflicts),
-                        "safety_score": alt_impact.get("safety_score", 0.8),
-                        "description": f"Alternative: Platform {platform} with {len(alt_conflicts)} conflicts"
-                    })
-            except Exception as e:
-                logger.error(f"Error evaluating alternative platform {platform}: {e}")
+    for platform, outcome in zip(alt_platforms, outcomes):
+        # Check if this platform would be better
+        if outcome is None:
+            continue
+        alt_conflicts, alt_impact = outcome
+        if len(alt_conflicts) <= conflicts_after:
+            alternatives.append({
+                "platform": platform,
+                "conflicts": len(alt_conflicts),
+                "safety_score": alt_impact.get("safety_score", 0.8),
+                "description": f"Alternative: Platform {platform} with {len(alt_conflicts)} conflicts"
+            })
     
     # Determine status
     if safety_score < 0.5 or conflicts_after > conflicts_before + 2:
@@ -1192,42 +1658,58 @@ def check_feasibility(req: FeasibilityRequest):
         reasons=reasons
     )
 
+# (etag, recommendations) of the last /recommendations build
+_recommendations_cache: Optional[tuple] = None
+
 @app.get("/recommendations", response_model=List[Recommendation])
-def get_recommendations(max_recommendations: int = 10):
+def get_recommendations(request: Request, response: Response, max_recommendations: int = 10):
     """
     Get intelligent recommendations for improving the schedule
     """
-    global schedule, current_conflicts
+    global _recommendations_cache
     
+    schedule = state.schedule
     if not schedule:
         return []
     
-    # Generate recommendations
-    recommendations = generate_recommendations(
-        trains, stations, schedule, current_conflicts, max_recommendations
+    # Recommendations are deterministic in the schedule and its conflicts, so the
+    # fingerprint is both the memo key and the ETag
+    conflicts = state.current_conflicts
+    etag = _etag(
+        state.trains_version, schedule_fingerprint(schedule), tuple(c.id for c in conflicts), max_recommendations
     )
+    cached = _recommendations_cache
+    if cached is not None and cached[0] == etag:
+        recommendations = cached[1]
+    else:
+        recommendations = generate_recommendations(
+            state.trains, state.stations, schedule, conflicts, max_recommendations
+        )
+        _recommendations_cache = (etag, recommendations)
     
     # Update global recommendations
-    global current_recommendations
-    current_recommendations = recommendations
+    state.current_recommendations = recommendations
     
+    not_modified = _not_modified(request, etag)
+    if not_modified is not None:
+        return not_modified
+    response.headers["ETag"] = etag
     return recommendations
 
 def _resolve_recommendation(recommendation_id: str) -> Optional[Recommendation]:
     """Find recommendation by ID, regenerating if the in-memory cache was refreshed."""
-    global current_recommendations, schedule, current_conflicts
 
-    found = next((r for r in current_recommendations if r.id == recommendation_id), None)
+    found = next((r for r in state.current_recommendations if r.id == recommendation_id), None)
     if found:
         return found
 
-    if not schedule:
+    if not state.schedule:
         return None
 
-    conflicts, _ = detect_conflicts(trains, stations, schedule)
-    current_conflicts = conflicts
-    refreshed = generate_recommendations(trains, stations, schedule, conflicts)
-    current_recommendations = refreshed
+    conflicts, _ = detect_conflicts_cached(state.schedule)
+    state.current_conflicts = conflicts
+    refreshed = generate_recommendations(state.trains, state.stations, state.schedule, conflicts)
+    state.current_recommendations = refreshed
     return next((r for r in refreshed if r.id == recommendation_id), None)
 
 
@@ -1238,40 +1720,35 @@ def _reoptimize_schedule_after_recommendation() -> None:
 @app.post("/apply-recommendation")
 def apply_recommendation(recommendation_id: str):
     """Apply a specific recommendation"""
-    global fixed_overrides, active_delays
 
     recommendation = _resolve_recommendation(recommendation_id)
     if not recommendation:
         raise HTTPException(status_code=404, detail="Recommendation not found")
 
     try:
-        if recommendation.action_type in ("change_platform", "move_train"):
-            if recommendation.new_platform is not None:
-                fixed_overrides[recommendation.train_id] = recommendation.new_platform
-
-        elif recommendation.action_type in ("delay_train", "swap_priority"):
-            if recommendation.delay_minutes:
-                if recommendation.train_id not in active_delays:
-                    active_delays[recommendation.train_id] = {}
-                active_delays[recommendation.train_id].update({
-                    "delay_type": "recommendation",
-                    "delay_minutes": recommendation.delay_minutes,
-                    "reason": f"Applied recommendation: {recommendation.description}",
-                    "timestamp": datetime.now()
-                })
-        else:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported recommendation action: {recommendation.action_type}",
-            )
+        with _schedule_lock:
+            if recommendation.action_type in ("change_platform", "move_train"):
+                if recommendation.new_platform is not None:
+                    state.fixed_overrides = {**state.fixed_overrides, recommendation.train_id: recommendation.new_platform}
+
+            elif recommendation.action_type in ("delay_train", "swap_priority"):
+                if recommendation.delay_minutes:
+                    state.active_delays = {**state.active_delays, recommendation.train_id: {
+                        **state.active_delays.get(recommendation.train_id, {}),
+                        "delay_type": "recommendation",
+                        "delay_minutes": recommendation.delay_minutes,
+                        "reason": f"Applied recommendation: {recommendation.description}",
+                        "timestamp": datetime.now()
+                    }}
+            else:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unsupported recommendation action: {recommendation.action_type}",
+                )
 
-        _reoptimize_schedule_after_recommendation()
+            _reoptimize_schedule_after_recommendation()
 
-        logs.append(LogEntry(
-            timestamp=datetime.now(),
-            action="recommendation_applied",
-            details=f"Applied recommendation: {recommendation.description}"
-        ))
+        _log("recommendation_applied", f"Applied recommendation: {recommendation.description}")
 
         notify_realtime_clients("schedule_update", {"source": "apply_recommendation", "recommendation_id": recommendation_id})
 
@@ -1313,17 +1790,13 @@ def _run_simulation(req: SimulationRequest) -> SimulationResponse:
     
     scenario_id = str(uuid.uuid4())
     
-    # Store current state
-    original_delays = copy.deepcopy(active_delays)
-    original_overrides = copy.deepcopy(fixed_overrides)
-    
     try:
-        # Apply scenario parameters
-        temp_delays = copy.deepcopy(active_delays)
-        temp_overrides = copy.deepcopy(fixed_overrides)
+        # Apply scenario parameters; the live dicts are replaced, never edited, so the
+        # scenario only needs its own delays layered over them
+        scenario_delays: Dict[str, Dict] = {}
         
         if req.scenario_type == "delay" and req.train_id and req.delay_minutes:
-            temp_delays[req.train_id] = {
+            scenario_delays[req.train_id] = {
                 "delay_type": req.scenario_type,
                 "delay_minutes": req.delay_minutes,
                 "reason": f"Simulated {req.scenario_type} scenario",
@@ -1333,7 +1806,7 @@ def _run_simulation(req: SimulationRequest) -> SimulationResponse:
         elif req.scenario_type == "breakdown" and req.train_id:
             # Simulate breakdown as significant delay
             breakdown_delay = req.delay_minutes or 60
-            temp_delays[req.train_id] = {
+            scenario_delays[req.train_id] = {
                 "delay_type": "breakdown",
                 "delay_minutes": breakdown_delay,
                 "reason": "Simulated train breakdown",
@@ -1343,23 +1816,28 @@ def _run_simulation(req: SimulationRequest) -> SimulationResponse:
         elif req.scenario_type == "weather":
             # Apply weather delays to multiple trains
             weather_delay = req.delay_minutes or 15
-            for train in trains[:3]:  # Affect first 3 trains
-                temp_delays[train.id] = {
+            for train in state.trains[:3]:  # Affect first 3 trains
+                scenario_delays[train.id] = {
                     "delay_type": "weather",
                     "delay_minutes": weather_delay,
                     "reason": "Simulated weather delay",
                     "timestamp": datetime.now()
                 }
         
+        temp_delays = {**state.active_delays, **scenario_delays}
+        temp_overrides = state.fixed_overrides
+        
         # Generate predicted schedule
-        if optimizer_settings.mode == "ilp":
-            predicted_schedule = ilp_optimizer(trains, stations, temp_overrides, temp_delays, optimizer_settings)
+        if state.optimizer_settings.mode == "ilp":
+            predicted_schedule = ilp_optimizer(
+                state.trains, state.stations, temp_overrides, temp_delays, state.optimizer_settings
+            )
         else:
-            predicted_schedule = greedy_optimizer_with_delays(trains, stations, temp_overrides, temp_delays)
+            predicted_schedule = greedy_optimizer_with_delays(state.trains, state.stations, temp_overrides, temp_delays)
         
         # Detect conflicts before and after
-        current_conflicts_list, current_impact = detect_conflicts(trains, stations, schedule)
-        predicted_conflicts, predicted_impact = detect_conflicts(trains, stations, predicted_schedule)
+        current_conflicts_list, current_impact = detect_conflicts_cached(state.schedule)
+        predicted_conflicts, predicted_impact = detect_conflicts_cached(predicted_schedule)
         
         # Calculate KPI deltas
         kpi_delta = {
@@ -1371,11 +1849,11 @@ def _run_simulation(req: SimulationRequest) -> SimulationResponse:
         
         # Generate recommendations for the scenario
         scenario_recommendations = generate_recommendations(
-            trains, stations, predicted_schedule, predicted_conflicts, 5
+            state.trains, state.stations, predicted_schedule, predicted_conflicts, 5
         )
         
         # Store scenario
-        simulation_scenarios[scenario_id] = {
+        state.simulation_scenarios[scenario_id] = {
             "request": req.dict(),
             "predicted_schedule": [entry.dict() for entry in predicted_schedule],
             "kpi_delta": kpi_delta,
@@ -1399,107 +1877,86 @@ def _run_simulation(req: SimulationRequest) -> SimulationResponse:
 def get_simulation_scenarios():
     """Get all stored simulation scenarios"""
     return {
-        "scenarios": simulation_scenarios,
-        "count": len(simulation_scenarios)
+        "scenarios": state.simulation_scenarios,
+        "count": len(state.simulation_scenarios)
     }
 
 @app.delete("/scenarios/{scenario_id}")
 def delete_scenario(scenario_id: str):
     """Delete a specific simulation scenario"""
-    if scenario_id in simulation_scenarios:
-        del simulation_scenarios[scenario_id]
+    if scenario_id in state.simulation_scenarios:
+        del state.simulation_scenarios[scenario_id]
         return {"status": "success", "message": "Scenario deleted"}
     else:
         raise HTTPException(status_code=404, detail="Scenario not found")
 
 @app.get("/settings/optimizer")
-def get_optimizer_settings():
+async def get_optimizer_settings():
     """Get current optimizer settings"""
-    return optimizer_settings.dict()
+    return state.optimizer_settings.dict()
 
 @app.post("/settings/optimizer")
 def update_optimizer_settings(settings: OptimizerSettings):
     """Update optimizer settings"""
-    global optimizer_settings
-    optimizer_settings = settings
+    state.optimizer_settings = settings
     
-    logs.append(LogEntry(
-        timestamp=datetime.now(),
-        action="optimizer_settings_updated",
-        details=f"Updated optimizer: mode={settings.mode}, objective={settings.objective}, time_limit={settings.time_limit_seconds}s"
-    ))
+    _log("optimizer_settings_updated", f"Updated optimizer: mode={settings.mode}, objective={settings.objective}, time_limit={settings.time_limit_seconds}s")
     
     return {"status": "success", "message": "Optimizer settings updated", "settings": settings.dict()}
 
+def _group_means(labels, values: np.ndarray) -> Dict:
+    """Mean of values per label, keyed in order of first appearance"""
+    index: Dict = {}
+    codes = np.fromiter((index.setdefault(label, len(index)) for label in labels), dtype=np.intp, count=values.size)
+    sums = np.bincount(codes, weights=values, minlength=len(index))
+    counts = np.bincount(codes, minlength=len(index))
+    return dict(zip(index, (sums / counts).tolist()))
+
+
+# (schedule list, trains_version, breakdown) for the last analytics aggregation; see _delay_vector_cache
+_delay_breakdown_cache: Optional[tuple] = None
+
+
+def _schedule_delay_breakdown() -> tuple:
+    """Total delay, on-time/delayed counts, mean delay per station and train type, and platform use"""
+    global _delay_breakdown_cache
+    cached = _delay_breakdown_cache
+    if cached is not None and cached[0] is state.schedule and cached[1] == state.trains_version:
+        return cached[2]
+    
+    pairs, delays = schedule_delays(state.schedule)
+    on_time_trains = int((delays <= 2).sum())  # On time if delay <= 2 minutes
+    breakdown = (
+        float(delays.sum()),
+        on_time_trains,
+        len(pairs) - on_time_trains,
+        _group_means((entry.station_id for entry, _ in pairs), delays),
+        _group_means((train.type for _, train in pairs), delays),
+        dict(Counter(f"{entry.station_id}_P{entry.assigned_platform}" for entry, _ in pairs)),
+    )
+    _delay_breakdown_cache = (state.schedule, state.trains_version, breakdown)
+    return breakdown
+
+
 @app.get("/analytics/summary")
 def get_analytics_summary():
     """Get comprehensive analytics summary"""
     ensure_schedule_state()
-    if not schedule:
+    if not state.schedule:
         return {"error": "No schedule data available"}
     
     # Calculate various metrics
-    total_trains = len(trains)
-    total_delays = 0
-    on_time_trains = 0
-    delayed_trains = 0
-    
-    delays_by_station = {}
-    delays_by_train_type = {}
-    platform_utilization = {}
-    
-    for entry in schedule:
-        train = next((t for t in trains if t.id == entry.train_id), None)
-        if not train:
-            continue
-        
-        delay_minutes = max(0.0, (entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0)
-        total_delays += delay_minutes
-        
-        if delay_minutes <= 2:  # On time if delay <= 2 minutes
-            on_time_trains += 1
-        else:
-            delayed_trains += 1
-        
-        # By station
-        if entry.station_id not in delays_by_station:
-            delays_by_station[entry.station_id] = []
-        delays_by_station[entry.station_id].append(delay_minutes)
-        
-        # By train type
-        if train.type not in delays_by_train_type:
-            delays_by_train_type[train.type] = []
-        delays_by_train_type[train.type].append(delay_minutes)
-        
-        # Platform utilization
-        station_key = f"{entry.station_id}_P{entry.assigned_platform}"
-        if station_key not in platform_utilization:
-            platform_utilization[station_key] = 0
-        platform_utilization[station_key] += 1
-    
-    # Calculate averages
-    avg_delays_by_station = {k: sum(v)/len(v) for k, v in delays_by_station.items()}
-    avg_delays_by_type = {k: sum(v)/len(v) for k, v in delays_by_train_type.items()}
+    total_trains = len(state.trains)
+    (total_delays, on_time_trains, delayed_trains, avg_delays_by_station,
+     avg_delays_by_type, platform_utilization) = _schedule_delay_breakdown()
     
     # Conflict analysis
     conflicts_analysis = {
-        "total_conflicts": len(current_conflicts),
-        "by_type": {},
-        "by_severity": {}
+        "total_conflicts": len(state.current_conflicts),
+        "by_type": dict(Counter(conflict.type for conflict in state.current_conflicts)),
+        "by_severity": dict(Counter(conflict.severity for conflict in state.current_conflicts))
     }
     
-    for conflict in current_conflicts:
-        conflict_type = conflict.type
-        severity = conflict.severity
-        
-        if conflict_type not in conflicts_analysis["by_type"]:
-            conflicts_analysis["by_type"][conflict_type] = 0
-        conflicts_analysis["by_type"][conflict_type] += 1
-        
-        if severity not in conflicts_analysis["by_severity"]:
-            conflicts_analysis["by_severity"][severity] = 0
-        conflicts_analysis["by_severity"][severity] += 1
-    
     payload = {
         "summary": {
             "total_trains": total_trains,
@@ -1513,16 +1970,16 @@ def get_analytics_summary():
         "delays_by_train_type": avg_delays_by_type,
         "platform_utilization": platform_utilization,
         "conflicts_analysis": conflicts_analysis,
-        "active_overrides": len(fixed_overrides),
-        "active_delays": len(active_delays),
-        "optimizer_mode": optimizer_settings.mode,
+        "active_overrides": len(state.fixed_overrides),
+        "active_delays": len(state.active_delays),
+        "optimizer_mode": state.optimizer_settings.mode,
         "last_updated": datetime.now().isoformat()
     }
     trend_store.record({
         "on_time_percentage": payload["summary"]["on_time_percentage"],
         "average_delay_minutes": payload["summary"]["average_delay_minutes"],
-        "conflict_count": len(current_conflicts),
-        "active_delays": len(active_delays),
+        "conflict_count": len(state.current_conflicts),
+        "active_delays": len(state.active_delays),
         "delays_by_station": avg_delays_by_station,
     })
     return payload
@@ -1544,10 +2001,10 @@ async def analyze_schedule_with_ai(query: str = "Analyze the current train sched
     try:
         # Prepare schedule data for AI analysis
         schedule_summary = {
-            "total_trains": len(trains),
-            "total_conflicts": len(current_conflicts),
-            "stations": list(stations.keys()),
-            "current_recommendations": len(current_recommendations)
+            "total_trains": len(state.trains),
+            "total_conflicts": len(state.current_conflicts),
+            "stations": list(state.stations.keys()),
+            "current_recommendations": len(state.current_recommendations)
         }
         
         prompt = f"""
@@ -1564,7 +2021,9 @@ async def analyze_schedule_with_ai(query: str = "Analyze the current train sched
         Please provide actionable insights and recommendations for optimizing the railway schedule.
         """
         
-        response = gemini_model.generate_content(prompt)
+        # The SDK's async call awaits the network round trip instead of blocking the event
+        # loop, which also drives the movement simulation and the WebSocket clients
+        response = await gemini_model.generate_content_async(prompt)
         
         return {
             "ai_response": response.text,
@@ -1576,7 +2035,7 @@ async def analyze_schedule_with_ai(query: str = "Analyze the current train sched
         raise HTTPException(status_code=500, detail=f"AI analysis failed: {str(e)}")
 
 @app.get("/ai/status")
-def get_ai_status():
+async def get_ai_status():
     """Check if Gemini AI is properly configured"""
     return {
         "gemini_configured": gemini_model is not None,
@@ -1591,8 +2050,8 @@ if __name__ == "__main__":
     print("📊 API Documentation: http://localhost:8000/docs")
     print("🔧 Starting server on http://localhost:8000")
     
-    # Start movement simulation automatically
-    start_train_movement_simulation()
-    print("🚂 Train movement simulation started automatically")
+    # Start movement simulation automatically once the event loop is up
+    _autostart_movements = True
+    print("🚂 Train movement simulation will start automatically")
     
     uvicorn.run(app, host="0.0.0.0", port=8000)
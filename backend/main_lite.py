@@ -1,8 +1,11 @@
 # Lightweight version for deployment with reduced memory usage
+import functools
+import importlib
 import os
 import sys
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from datetime import datetime
 import json
 from typing import List, Dict, Optional
@@ -30,31 +33,43 @@ ALLOWED_ORIGINS = [
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=ALLOWED_ORIGINS + ["*"],  # Allow all for now, restrict in production
+    allow_origins=ALLOWED_ORIGINS,
+    allow_origin_regex=r"https?://(localhost|127\.0\.0\.1)(:\d+)?",
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
+    max_age=86400,  # let browsers reuse a preflight for a day
 )
 
+# Schedule payloads repeat station ids and reason prefixes, so they compress well
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Configure Gemini AI
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
-gemini_model = None
-if GEMINI_API_KEY:
+if not GEMINI_API_KEY:
+    print("⚠️ GEMINI_API_KEY not found in environment variables")
+
+
+@functools.lru_cache(maxsize=1)
+def _get_gemini_model():
+    """Import and configure the Gemini SDK on first use; it is heavy and health checks never need it"""
+    if not GEMINI_API_KEY:
+        return None
     try:
         import google.generativeai as genai
         genai.configure(api_key=GEMINI_API_KEY)
-        gemini_model = genai.GenerativeModel(GEMINI_MODEL)
+        model = genai.GenerativeModel(GEMINI_MODEL)
         print(f"✅ Gemini AI configured with model: {GEMINI_MODEL}")
+        return model
     except Exception as e:
         print(f"⚠️ Gemini AI configuration failed: {e}")
-else:
-    print("⚠️ GEMINI_API_KEY not found in environment variables")
+        return None
 
 # Basic health check
 @app.get("/")
-def root():
+async def root():
     return {
         "message": "TrainVision AI Backend is running!",
         "version": "1.0.0",
@@ -63,23 +78,25 @@ def root():
     }
 
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
 @app.get("/ai/status")
-def get_ai_status():
-    """Check if Gemini AI is properly configured"""
+async def get_ai_status():
+    """Check if Gemini AI is properly configured (from the key alone, without loading the SDK)"""
+    configured = bool(GEMINI_API_KEY)
     return {
-        "gemini_configured": gemini_model is not None,
-        "model": GEMINI_MODEL if gemini_model else None,
-        "api_key_set": bool(GEMINI_API_KEY),
-        "status": "ready" if gemini_model else "not_configured"
+        "gemini_configured": configured,
+        "model": GEMINI_MODEL if configured else None,
+        "api_key_set": configured,
+        "status": "ready" if configured else "not_configured"
     }
 
 # Simple AI endpoint for testing
 @app.post("/ai/test")
 async def test_ai(query: str = "Hello, how are you?"):
     """Test Gemini AI with a simple query"""
+    gemini_model = _get_gemini_model()
     if not gemini_model:
         raise HTTPException(status_code=503, detail="Gemini AI not configured")
     
@@ -94,35 +111,23 @@ async def test_ai(query: str = "Hello, how are you?"):
         raise HTTPException(status_code=500, detail=f"AI test failed: {str(e)}")
 
 # Lazy load the full application
-_full_app_loaded = False
-
-def load_full_app():
-    """Lazy load the full application when needed"""
-    global _full_app_loaded
-    if _full_app_loaded:
-        return
-    
-    try:
-        # Import the full main module
-        from main import *
-        _full_app_loaded = True
-        print("✅ Full application loaded successfully")
-    except Exception as e:
-        print(f"⚠️ Could not load full application: {e}")
+def _lazy(name: str):
+    """Look up name on the full main module, importing it on first use"""
+    return getattr(importlib.import_module("main"), name)
 
 # Proxy endpoint to load full app on demand
 @app.get("/trains")
 def get_trains_proxy():
-    load_full_app()
-    if _full_app_loaded:
-        from main import get_trains
-        return get_trains()
-    else:
+    try:
+        get_trains = _lazy("get_trains")
+    except Exception as e:
+        print(f"⚠️ Could not load full application: {e}")
         # Return mock data if full app can't load
         return [
             {"id": "T101", "type": "Express", "status": "scheduled"},
             {"id": "T102", "type": "Local", "status": "scheduled"}
         ]
+    return get_trains()
 
 if __name__ == "__main__":
     import uvicorn
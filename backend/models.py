@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List, Literal
+from typing import Optional, List, Literal, Tuple
 from datetime import datetime
 
 class Station(BaseModel):
@@ -69,10 +69,12 @@ class Conflict(BaseModel):
     type: Literal["platform_overlap", "headway_violation", "priority_conflict"]
     station_id: str
     platform: Optional[int] = None
-    trains_involved: List[str]
+    # Immutable tuples: conflicts are never edited after detection and tuples
+    # carry no over-allocation; both still serialize as JSON arrays
+    trains_involved: Tuple[str, ...]
     root_cause: str
     severity: Literal["low", "medium", "high", "critical"]
-    suggested_actions: List[str]
+    suggested_actions: Tuple[str, ...]
 
 class Recommendation(BaseModel):
     id: str
@@ -104,3 +106,7 @@ class OptimizerSettings(BaseModel):
     mode: Literal["greedy", "ilp"] = "greedy"
     objective: Literal["minimize_delays", "minimize_conflicts", "balanced"] = "balanced"
     time_limit_seconds: Optional[int] = 30
+    # Relative MIP gap at which the ILP stops; 1% is already below the schedule's minute granularity
+    mip_gap: float = 0.01
+    # ILP search window: a train may start at most this many minutes after its booked arrival
+    max_delay_minutes: Optional[int] = 60
@@ -1,25 +1,32 @@
-from datetime import timedelta
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from models import Train, Station, ScheduleEntry
 from train_legs import get_train_legs
 import logging
-import copy
 
-MAX_DELAY = 10  # minutes, after which we increase priority
+MAX_DELAY = 10  # minutes; a leg still blocked after this is force-assigned to P1
+LEG_DWELL = timedelta(minutes=5)  # platform time at intermediate stops
+DELAY_STEP = timedelta(minutes=2)  # how far a leg is pushed back when every platform is taken
 logger = logging.getLogger(__name__)
 
 
 def _leg_times(train: Train, leg_index: int, total_legs: int):
     """Synthetic per-leg timing from train booked times."""
     travel = timedelta(minutes=18 * leg_index)
-    dwell = timedelta(minutes=5)
     arrival = train.scheduled_arrival + travel
     departure = train.scheduled_departure + travel
     if leg_index < total_legs - 1:
-        departure = arrival + dwell
+        departure = arrival + LEG_DWELL
     return arrival, departure
 
 
+def _longest_slot(trains: List[Train]) -> timedelta:
+    """Upper bound on the platform time of any leg _leg_times produces for trains."""
+    return max([LEG_DWELL, *(t.scheduled_departure - t.scheduled_arrival for t in trains)])
+
+
 def greedy_optimizer(
     trains: List[Train],
     stations: Dict[str, Station],
@@ -27,7 +34,7 @@ def greedy_optimizer(
     legs_override: Optional[Dict[str, List[str]]] = None,
 ) -> List[ScheduleEntry]:
     schedule = []
-    platform_usage = {st.id: {} for st in stations.values()}
+    platform_usage = {st.id: {} for st in stations.values()}  # station -> platform -> arrival-sorted [(arrival, departure, train_id)]
 
     # Sort trains: Fixed overrides first (regardless of priority), then by priority and arrival time
     def sort_key(train):
@@ -38,12 +45,13 @@ def greedy_optimizer(
             return (1, -train.priority, train.scheduled_arrival)  # Then normal priority order
     
     trains_sorted = sorted(trains, key=sort_key)
+    longest = _longest_slot(trains)
 
     for train in trains_sorted:
         legs = get_train_legs(train, legs_override)
         for leg_index, station_id in enumerate(legs):
             if station_id not in stations:
-                logger.warning(f"Station {station_id} not found for train {train.id}")
+                logger.warning("Station %s not found for train %s", station_id, train.id)
                 continue
 
             is_override = fixed_platforms and train.id in fixed_platforms and leg_index == 0
@@ -53,6 +61,9 @@ def greedy_optimizer(
             attempts = 0
             conflicts_encountered = []
 
+            station_usage = platform_usage.setdefault(station_id, {})  # looked up once per leg
+            platform_count = stations[station_id].platforms
+
             assigned = False
             while not assigned and attempts < 50:  # Prevent infinite loops
                 attempts += 1
@@ -60,32 +71,19 @@ def greedy_optimizer(
                 conflict_with: Optional[str] = None
                 conflicting_train = None
                 
-                # Initialize platform usage for this station if not exists
-                if station_id not in platform_usage:
-                    platform_usage[station_id] = {}
-                    
                 # check if platform free
-                if platform in platform_usage[station_id]:
-                    for used_slot in platform_usage[station_id][platform]:
-                        if not (departure <= used_slot[0] or arrival >= used_slot[1]):
-                            conflict = True
-                            # Find which train is using this slot
-                            for existing in schedule:
-                                if (existing.station_id == station_id and 
-                                    existing.assigned_platform == platform and
-                                    existing.actual_arrival == used_slot[0]):
-                                    conflicting_train = existing.train_id
-                                    break
-                            conflict_with = f"conflicts with {conflicting_train or 'another train'}"
-                            if conflicting_train:
-                                conflicts_encountered.append(conflicting_train)
-                            break
+                if platform in station_usage:
+                    conflicting_train = _blocking_train(station_usage[platform], arrival, departure, longest)
+                    if conflicting_train is not None:
+                        conflict = True
+                        conflict_with = f"conflicts with {conflicting_train}"
+                        conflicts_encountered.append(conflicting_train)
 
                 if not conflict:
                     # Assign here
-                    if platform not in platform_usage[station_id]:
-                        platform_usage[station_id][platform] = []
-                    platform_usage[station_id][platform].append((arrival, departure))
+                    if platform not in station_usage:
+                        station_usage[platform] = []
+                    insort(station_usage[platform], (arrival, departure, train.id))
                     
                     reason_bits = []
                     if is_override:
@@ -117,23 +115,23 @@ def greedy_optimizer(
                         reason=reason_text
                     ))
                     
-                    logger.info(f"Assigned {train.id} to {station_id} P{platform}, delay: {delay}min")
+                    logger.info("Assigned %s to %s P%s, delay: %smin", train.id, station_id, platform, delay)
                     assigned = True
                 else:
                     # Try next platform
                     platform += 1
-                    if platform > stations[station_id].platforms:
+                    if platform > platform_count:
                         # No platform free → delay
-                        arrival += timedelta(minutes=2)
-                        departure += timedelta(minutes=2)
+                        arrival += DELAY_STEP
+                        departure += DELAY_STEP
                         platform = 1
                         delay += 2
 
-                        # If delay > MAX_DELAY → increase effective priority
+                        # Past MAX_DELAY → force-assign rather than keep delaying
                         if delay >= MAX_DELAY:
-                            if platform not in platform_usage[station_id]:
-                                platform_usage[station_id][platform] = []
-                            platform_usage[station_id][platform].append((arrival, departure))
+                            if platform not in station_usage:
+                                station_usage[platform] = []
+                            insort(station_usage[platform], (arrival, departure, train.id))
                             reason_text = (
                                 f"forced to P{platform} after {delay}min delay cap"
                             )
@@ -146,7 +144,7 @@ def greedy_optimizer(
                                 reason=reason_text,
                             ))
                             logger.warning(
-                                f"Force-assigned {train.id} at {station_id} P{platform} after max delay"
+                                "Force-assigned %s at %s P%s after max delay", train.id, station_id, platform
                             )
                             assigned = True
 
@@ -161,24 +159,27 @@ def greedy_optimizer_with_delays(
 ) -> List[ScheduleEntry]:
     """Enhanced greedy optimizer that handles injected delays"""
     schedule = []
-    platform_usage = {st.id: {} for st in stations.values()}
+    platform_usage = {st.id: {} for st in stations.values()}  # station -> platform -> arrival-sorted [(arrival, departure, train_id)]
     
     # Apply delays to trains
     modified_trains = []
     for train in trains:
-        modified_train = copy.deepcopy(train)
+        modified_train = train
         
-        # Apply delay if exists
+        # Apply delay if exists; undelayed trains are used as-is since nothing edits them
         if active_delays and train.id in active_delays:
             delay_info = active_delays[train.id]
             delay_minutes = delay_info.get('delay_minutes', 0)
             delay_type = delay_info.get('delay_type', 'unknown')
             
             # Apply delay to arrival and departure times
-            modified_train.scheduled_arrival += timedelta(minutes=delay_minutes)
-            modified_train.scheduled_departure += timedelta(minutes=delay_minutes)
+            shift = timedelta(minutes=delay_minutes)
+            modified_train = train.model_copy(update={
+                "scheduled_arrival": train.scheduled_arrival + shift,
+                "scheduled_departure": train.scheduled_departure + shift,
+            })
             
-            logger.info(f"Applied {delay_minutes}min {delay_type} delay to {train.id}")
+            logger.info("Applied %smin %s delay to %s", delay_minutes, delay_type, train.id)
         
         modified_trains.append(modified_train)
     
@@ -191,12 +192,13 @@ def greedy_optimizer_with_delays(
             return (1, -train.priority, train.scheduled_arrival)  # Then normal priority order
     
     trains_sorted = sorted(modified_trains, key=sort_key)
+    longest = _longest_slot(modified_trains)
 
     for train in trains_sorted:
         legs = get_train_legs(train, legs_override)
         for leg_index, station_id in enumerate(legs):
             if station_id not in stations:
-                logger.warning(f"Station {station_id} not found for train {train.id}")
+                logger.warning("Station %s not found for train %s", station_id, train.id)
                 continue
 
             is_override = fixed_platforms and train.id in fixed_platforms and leg_index == 0
@@ -213,6 +215,9 @@ def greedy_optimizer_with_delays(
                 delay_info = active_delays[train.id]
                 delay_reason = f" ({delay_info.get('delay_type', 'unknown')} delay: {delay_info.get('delay_minutes', 0)}min)"
 
+            station_usage = platform_usage.setdefault(station_id, {})  # looked up once per leg
+            platform_count = stations[station_id].platforms
+
             assigned = False
             while not assigned and attempts < 50:  # Prevent infinite loops
                 attempts += 1
@@ -220,32 +225,19 @@ def greedy_optimizer_with_delays(
                 conflict_with: Optional[str] = None
                 conflicting_train = None
 
-                # Initialize platform usage for this station if not exists
-                if station_id not in platform_usage:
-                    platform_usage[station_id] = {}
-
                 # Check if platform is free
-                if platform in platform_usage[station_id]:
-                    for used_slot in platform_usage[station_id][platform]:
-                        if not (departure <= used_slot[0] or arrival >= used_slot[1]):
-                            conflict = True
-                            # Find which train is using this slot
-                            for existing in schedule:
-                                if (existing.station_id == station_id and
-                                    existing.assigned_platform == platform and
-                                    existing.actual_arrival == used_slot[0]):
-                                    conflicting_train = existing.train_id
-                                    break
-                            conflict_with = f"conflicts with {conflicting_train or 'another train'}"
-                            if conflicting_train:
-                                conflicts_encountered.append(conflicting_train)
-                            break
+                if platform in station_usage:
+                    conflicting_train = _blocking_train(station_usage[platform], arrival, departure, longest)
+                    if conflicting_train is not None:
+                        conflict = True
+                        conflict_with = f"conflicts with {conflicting_train}"
+                        conflicts_encountered.append(conflicting_train)
 
                 if not conflict:
                     # Assign here
-                    if platform not in platform_usage[station_id]:
-                        platform_usage[station_id][platform] = []
-                    platform_usage[station_id][platform].append((arrival, departure))
+                    if platform not in station_usage:
+                        station_usage[platform] = []
+                    insort(station_usage[platform], (arrival, departure, train.id))
 
                     reason_bits = []
                     if is_override:
@@ -282,22 +274,22 @@ def greedy_optimizer_with_delays(
                         reason=reason_text
                     ))
 
-                    logger.info(f"Assigned {train.id} to {station_id} P{platform}, delay: {delay}min{delay_reason}")
+                    logger.info("Assigned %s to %s P%s, delay: %smin%s", train.id, station_id, platform, delay, delay_reason)
                     assigned = True
                 else:
                     # Try next platform
                     platform += 1
-                    if platform > stations[station_id].platforms:
+                    if platform > platform_count:
                         # No platform free → delay
-                        arrival += timedelta(minutes=2)
-                        departure += timedelta(minutes=2)
+                        arrival += DELAY_STEP
+                        departure += DELAY_STEP
                         platform = 1
                         delay += 2
 
                         if delay >= MAX_DELAY:
-                            if platform not in platform_usage[station_id]:
-                                platform_usage[station_id][platform] = []
-                            platform_usage[station_id][platform].append((arrival, departure))
+                            if platform not in station_usage:
+                                station_usage[platform] = []
+                            insort(station_usage[platform], (arrival, departure, train.id))
                             reason_text = (
                                 f"forced to P{platform} after {delay}min delay cap"
                             )
@@ -313,7 +305,186 @@ def greedy_optimizer_with_delays(
                                 reason=reason_text,
                             ))
                             logger.warning(
-                                f"Force-assigned {train.id} at {station_id} P{platform} after max delay"
+                                "Force-assigned %s at %s P%s after max delay", train.id, station_id, platform
                             )
                             assigned = True
-    return schedule
\ No newline at end of file
+    return schedule
+
+
+def platform_intervals(entries: List[ScheduleEntry]) -> Dict[Tuple[str, int], List[Tuple[datetime, datetime, str]]]:
+    """Arrival-sorted (arrival, departure, train_id) slots per (station, platform)."""
+    intervals = defaultdict(list)
+    for entry in entries:
+        intervals[(entry.station_id, entry.assigned_platform)].append(
+            (entry.actual_arrival, entry.actual_departure, entry.train_id)
+        )
+    for slots in intervals.values():
+        slots.sort()
+    return intervals
+
+
+def overlapping_slots(slots, arrival, departure) -> List[Tuple[datetime, datetime, str]]:
+    """Slots of an arrival-sorted list that overlap [arrival, departure)."""
+    # Only slots arriving before our departure can overlap; bisect cuts off the rest
+    return [slot for slot in slots[:bisect_left(slots, (departure,))] if arrival < slot[1]]
+
+
+def _blocking_train(slots, arrival, departure, longest: Optional[timedelta] = None) -> Optional[str]:
+    """Train id of a slot overlapping [arrival, departure), or None if the platform is free.
+
+    Without longest this is the first overlapping slot. With longest, an upper bound on
+    slot length, the scan walks back from our departure and stops at the first slot that
+    arrived too early to still be occupying the platform.
+    """
+    idx = bisect_left(slots, (departure,))
+    if longest is None:
+        for slot_arrival, slot_departure, train_id in slots[:idx]:
+            if arrival < slot_departure:
+                return train_id
+        return None
+    earliest = arrival - longest
+    while idx:
+        idx -= 1
+        slot_arrival, slot_departure, train_id = slots[idx]
+        if slot_arrival <= earliest:
+            return None
+        if arrival < slot_departure:
+            return train_id
+    return None
+
+
+def _place_leg(train, leg_index, legs, station, occupancy, platform, is_override) -> Optional[ScheduleEntry]:
+    """Place one leg with the same platform-then-delay rules as greedy_optimizer."""
+    arrival, departure = _leg_times(train, leg_index, len(legs))
+    station_id = station.id
+    delay = 0
+    conflicts_encountered = []
+
+    for attempts in range(1, 51):
+        blocking = _blocking_train(occupancy[(station_id, platform)], arrival, departure)
+        if blocking is None:
+            reason_bits = []
+            if is_override:
+                reason_bits.append(f"OVERRIDE: fixed to P{platform} by controller")
+            elif train.platform_pref and platform == train.platform_pref:
+                reason_bits.append(f"assigned to preferred P{platform}")
+            elif train.platform_pref and platform != train.platform_pref:
+                reason_bits.append(f"moved from P{train.platform_pref} to P{platform}")
+            else:
+                reason_bits.append(f"assigned to P{platform}")
+            if delay > 0:
+                reason_bits.append(f"delayed {delay} min")
+                if conflicts_encountered:
+                    reason_bits.append(f"resolved conflicts with {', '.join(set(conflicts_encountered))}")
+            if attempts > 1:
+                reason_bits.append(f"{attempts} attempts")
+            reason = ", ".join(reason_bits)
+            break
+        conflicts_encountered.append(blocking)
+        platform += 1
+        if platform > station.platforms:
+            arrival += DELAY_STEP
+            departure += DELAY_STEP
+            platform = 1
+            delay += 2
+            if delay >= MAX_DELAY:
+                reason = f"forced to P{platform} after {delay}min delay cap"
+                break
+    else:
+        return None
+
+    insort(occupancy[(station_id, platform)], (arrival, departure, train.id))
+    return ScheduleEntry(
+        train_id=train.id,
+        station_id=station_id,
+        assigned_platform=platform,
+        actual_arrival=arrival,
+        actual_departure=departure,
+        reason=reason,
+    )
+
+
+def repair_override(
+    schedule: List[ScheduleEntry],
+    trains: List[Train],
+    stations: Dict[str, Station],
+    fixed_platforms: Dict[str, int],
+    train_id: str,
+    legs_override: Optional[Dict[str, List[str]]] = None,
+    max_affected_ratio: float = 0.3,
+) -> Optional[List[ScheduleEntry]]:
+    """
+    Re-place an overridden train and only the legs it displaces.
+
+    The overridden train is placed around the other fixed trains, as a full greedy run
+    would, and the non-fixed legs it now overlaps are re-placed in greedy order into the
+    remaining free slots; every other entry is kept. Returns None when the fallout
+    exceeds max_affected_ratio of the trains so the caller can recompute from scratch.
+    """
+    trains_by_id = {t.id: t for t in trains}
+    target = trains_by_id.get(train_id)
+    if target is None or train_id not in fixed_platforms:
+        return None
+
+    kept = [e for e in schedule if e.train_id != train_id]
+    occupancy = platform_intervals([e for e in kept if e.train_id in fixed_platforms])
+    movable = platform_intervals(
+        [e for e in kept if e.train_id not in fixed_platforms and e.train_id in trains_by_id]
+    )
+
+    legs = get_train_legs(target, legs_override)
+    placed = []
+    for leg_index, station_id in enumerate(legs):
+        if station_id not in stations:
+            continue
+        entry = _place_leg(
+            target, leg_index, legs, stations[station_id], occupancy, fixed_platforms[train_id], leg_index == 0
+        )
+        if entry is not None:
+            placed.append(entry)
+
+    # Legs of movable trains that now sit on one of the target's new slots
+    evicted_slots = set()
+    for entry in placed:
+        key = (entry.station_id, entry.assigned_platform)
+        for slot in overlapping_slots(movable.get(key, ()), entry.actual_arrival, entry.actual_departure):
+            evicted_slots.add((key, slot))
+    evicted = {
+        idx for idx, e in enumerate(kept)
+        if ((e.station_id, e.assigned_platform), (e.actual_arrival, e.actual_departure, e.train_id)) in evicted_slots
+    }
+
+    affected = {kept[idx].train_id for idx in evicted}
+    if len(affected) > max_affected_ratio * len(trains):
+        return None
+
+    for key, slots in movable.items():
+        for slot in slots:
+            if (key, slot) not in evicted_slots:
+                insort(occupancy[key], slot)
+
+    # Re-place evicted legs in the order greedy_optimizer would have visited them
+    legs_by_train = {tid: get_train_legs(trains_by_id[tid], legs_override) for tid in affected}
+
+    def visit_order(idx):
+        entry = kept[idx]
+        train = trains_by_id[entry.train_id]
+        return (-train.priority, train.scheduled_arrival, legs_by_train[train.id].index(entry.station_id))
+
+    replaced: Dict[int, Optional[ScheduleEntry]] = {}
+    for idx in sorted(evicted, key=visit_order):
+        entry = kept[idx]
+        train = trains_by_id[entry.train_id]
+        legs = legs_by_train[train.id]
+        replaced[idx] = _place_leg(
+            train, legs.index(entry.station_id), legs, stations[entry.station_id],
+            occupancy, train.platform_pref or 1, False,
+        )
+
+    logger.info("Repaired override for %s: %d legs of %d trains re-placed", train_id, len(evicted), len(affected))
+    repaired = list(placed)
+    for idx, entry in enumerate(kept):
+        entry = replaced[idx] if idx in evicted else entry
+        if entry is not None:
+            repaired.append(entry)
+    return repaired
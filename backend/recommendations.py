@@ -1,8 +1,13 @@
 """
 Intelligent recommendations engine for train scheduling decisions
 """
+from bisect import bisect_left
+from dataclasses import dataclass
+import heapq
+from itertools import accumulate
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
+import numpy as np
 from models import Train, Station, ScheduleEntry, Conflict, Recommendation
 from conflict_detector import detect_conflicts
 import uuid
@@ -11,6 +16,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 RECOMMENDATION_NAMESPACE = uuid.UUID("6ba7b810-9dad-11d1-80b4-00c04fd430c8")
+SIGNIFICANT_DELAY = timedelta(minutes=15)  # arrival delay past which a platform move is suggested
+MAX_PLATFORM_ALTERNATIVES = 3  # platform moves suggested per conflict
 
 
 def stable_recommendation_id(
@@ -32,10 +39,52 @@ def stable_recommendation_id(
     ])
     return str(uuid.uuid5(RECOMMENDATION_NAMESPACE, key))
 
+@dataclass(slots=True)
+class _Candidate:
+    """A Recommendation still being ranked; validated and given its id only if returned."""
+    action_type: str
+    description: str
+    train_id: str
+    cost_benefit: dict
+    impact: dict
+    station_id: Optional[str] = None
+    new_platform: Optional[int] = None
+    delay_minutes: Optional[int] = None
+    
+    def to_recommendation(self) -> Recommendation:
+        return Recommendation(
+            id=stable_recommendation_id(
+                self.action_type, self.description, self.train_id,
+                self.station_id, self.new_platform, self.delay_minutes,
+            ),
+            action_type=self.action_type,
+            description=self.description,
+            train_id=self.train_id,
+            station_id=self.station_id,
+            new_platform=self.new_platform,
+            delay_minutes=self.delay_minutes,
+            cost_benefit=self.cost_benefit,
+            impact=self.impact,
+        )
+
+
 class RecommendationsEngine:
     def __init__(self, trains: List[Train], stations: Dict[str, Station]):
         self.trains = trains
         self.stations = stations
+        self._train_by_id: Dict[str, Train] = {}
+        for train in trains:
+            self._train_by_id.setdefault(train.id, train)
+        # (schedule, station -> platform -> entries in schedule order,
+        #  (station, platform) -> (sorted arrivals, running max departure),
+        #  train -> first entry in schedule order,
+        #  (station, arrival, departure) -> free platforms already looked up) of the last schedule indexed
+        self._index: Optional[Tuple[List[ScheduleEntry], Dict[str, Dict[int, List[ScheduleEntry]]],
+                                    Dict[Tuple[str, int], Tuple[List[datetime], List[datetime]]],
+                                    Dict[str, ScheduleEntry],
+                                    Dict[Tuple[str, datetime, datetime], List[int]]]] = None
+        # (schedule, conflicts) detected for the last schedule passed without conflicts
+        self._detected: Optional[Tuple[List[ScheduleEntry], List[Conflict]]] = None
         
     def generate_recommendations(self, schedule: List[ScheduleEntry], 
                                conflicts: Optional[List[Conflict]] = None,
@@ -44,12 +93,14 @@ class RecommendationsEngine:
         Generate actionable recommendations to improve the schedule
         """
         if conflicts is None:
-            conflicts, _ = detect_conflicts(self.trains, self.stations, schedule)
+            if self._detected is None or self._detected[0] is not schedule:
+                self._detected = (schedule, detect_conflicts(self.trains, self.stations, schedule)[0])
+            conflicts = self._detected[1]
         
         recommendations = []
         
         # Generate conflict resolution recommendations
-        conflict_recs = self._generate_conflict_resolutions(schedule, conflicts)
+        conflict_recs = self._generate_conflict_resolutions(schedule, conflicts, self._schedule_index(schedule)[3])
         recommendations.extend(conflict_recs)
         
         # Generate optimization recommendations
@@ -60,23 +111,30 @@ class RecommendationsEngine:
         proactive_recs = self._generate_proactive_recommendations(schedule)
         recommendations.extend(proactive_recs)
         
+        # Drop repeated proposals before scoring them
+        recommendations = self._dedupe_recommendations(recommendations)
+        
         # Score and rank recommendations
         scored_recs = self._score_recommendations(recommendations, schedule)
         
-        # Return top N recommendations
-        return sorted(scored_recs, key=lambda x: x.cost_benefit["cost_score"], reverse=True)[:max_recommendations]
+        # Return top N recommendations (ties keep generation order, as a stable sort would)
+        top_recs = heapq.nlargest(max_recommendations, scored_recs, key=lambda x: x.cost_benefit["cost_score"])
+        
+        # Only the returned candidates become Recommendations, with their stable ids
+        return [rec.to_recommendation() for rec in top_recs]
     
     def _generate_conflict_resolutions(self, schedule: List[ScheduleEntry], 
-                                     conflicts: List[Conflict]) -> List[Recommendation]:
+                                     conflicts: List[Conflict],
+                                     entries_by_train: Dict[str, ScheduleEntry]) -> List[_Candidate]:
         """Generate recommendations to resolve specific conflicts"""
         recommendations = []
         
         for conflict in conflicts:
             if conflict.type == "platform_overlap":
-                recs = self._resolve_platform_overlap(schedule, conflict)
+                recs = self._resolve_platform_overlap(schedule, conflict, entries_by_train)
                 recommendations.extend(recs)
             elif conflict.type == "headway_violation":
-                recs = self._resolve_headway_violation(schedule, conflict)
+                recs = self._resolve_headway_violation(schedule, conflict, entries_by_train)
                 recommendations.extend(recs)
             elif conflict.type == "priority_conflict":
                 recs = self._resolve_priority_conflict(schedule, conflict)
@@ -85,7 +143,8 @@ class RecommendationsEngine:
         return recommendations
     
     def _resolve_platform_overlap(self, schedule: List[ScheduleEntry], 
-                                conflict: Conflict) -> List[Recommendation]:
+                                conflict: Conflict,
+                                entries_by_train: Dict[str, ScheduleEntry]) -> List[_Candidate]:
         """Generate recommendations to resolve platform overlap conflicts"""
         recommendations = []
         
@@ -93,8 +152,8 @@ class RecommendationsEngine:
             return recommendations
         
         train1_id, train2_id = conflict.trains_involved
-        train1_entry = next((e for e in schedule if e.train_id == train1_id), None)
-        train2_entry = next((e for e in schedule if e.train_id == train2_id), None)
+        train1_entry = entries_by_train.get(train1_id)
+        train2_entry = entries_by_train.get(train2_id)
         
         if not train1_entry or not train2_entry:
             return recommendations
@@ -108,44 +167,30 @@ class RecommendationsEngine:
             schedule, conflict.station_id, train2_entry.actual_arrival, train2_entry.actual_departure
         )
         
-        for platform in available_platforms:
-            if platform != conflict.platform:
-                recommendations.append(Recommendation(
-                    id=stable_recommendation_id(
-                        "change_platform",
-                        f"Move {train2_id} from Platform {conflict.platform} to Platform {platform}",
-                        train2_id,
-                        conflict.station_id,
-                        platform,
-                    ),
-                    action_type="change_platform",
-                    description=f"Move {train2_id} from Platform {conflict.platform} to Platform {platform}",
-                    train_id=train2_id,
-                    station_id=conflict.station_id,
-                    new_platform=platform,
-                    cost_benefit={
-                        "delay_reduction": 0,
-                        "conflicts_resolved": 1,
-                        "cost_score": 0.8
-                    },
-                    impact={
-                        "affected_trains": [train2_id],
-                        "total_delay_change": 0
-                    }
-                ))
+        alternatives = [platform for platform in available_platforms if platform != conflict.platform]
+        for platform in alternatives[:MAX_PLATFORM_ALTERNATIVES]:
+            recommendations.append(_Candidate(
+                action_type="change_platform",
+                description=f"Move {train2_id} from Platform {conflict.platform} to Platform {platform}",
+                train_id=train2_id,
+                station_id=conflict.station_id,
+                new_platform=platform,
+                cost_benefit={
+                    "delay_reduction": 0,
+                    "conflicts_resolved": 1,
+                    "cost_score": 0.8
+                },
+                impact={
+                    "affected_trains": [train2_id],
+                    "total_delay_change": 0
+                }
+            ))
         
         # Option 2: Delay second train
         overlap_minutes = (train1_entry.actual_departure - train2_entry.actual_arrival).total_seconds() / 60
         delay_needed = int(overlap_minutes + 5)  # Add 5 min buffer
         
-        recommendations.append(Recommendation(
-            id=stable_recommendation_id(
-                "delay_train",
-                f"Delay {train2_id} by {delay_needed} minutes to avoid platform conflict",
-                train2_id,
-                conflict.station_id,
-                delay_minutes=delay_needed,
-            ),
+        recommendations.append(_Candidate(
             action_type="delay_train",
             description=f"Delay {train2_id} by {delay_needed} minutes to avoid platform conflict",
             train_id=train2_id,
@@ -165,7 +210,8 @@ class RecommendationsEngine:
         return recommendations
     
     def _resolve_headway_violation(self, schedule: List[ScheduleEntry], 
-                                 conflict: Conflict) -> List[Recommendation]:
+                                 conflict: Conflict,
+                                 entries_by_train: Dict[str, ScheduleEntry]) -> List[_Candidate]:
         """Generate recommendations to resolve headway violations"""
         recommendations = []
         
@@ -173,8 +219,8 @@ class RecommendationsEngine:
             return recommendations
         
         train1_id, train2_id = conflict.trains_involved
-        train1_entry = next((e for e in schedule if e.train_id == train1_id), None)
-        train2_entry = next((e for e in schedule if e.train_id == train2_id), None)
+        train1_entry = entries_by_train.get(train1_id)
+        train2_entry = entries_by_train.get(train2_id)
         
         if not train1_entry or not train2_entry:
             return recommendations
@@ -185,14 +231,7 @@ class RecommendationsEngine:
         delay_needed = int(min_headway - current_headway + 2)  # Add 2 min buffer
         
         # Option 1: Delay second train
-        recommendations.append(Recommendation(
-            id=stable_recommendation_id(
-                "delay_train",
-                f"Delay {train2_id} by {delay_needed} minutes to ensure safe headway",
-                train2_id,
-                conflict.station_id,
-                delay_minutes=delay_needed,
-            ),
+        recommendations.append(_Candidate(
             action_type="delay_train",
             description=f"Delay {train2_id} by {delay_needed} minutes to ensure safe headway",
             train_id=train2_id,
@@ -214,36 +253,29 @@ class RecommendationsEngine:
             schedule, conflict.station_id, train2_entry.actual_arrival, train2_entry.actual_departure
         )
         
-        for platform in available_platforms:
-            if platform != conflict.platform:
-                recommendations.append(Recommendation(
-                    id=stable_recommendation_id(
-                        "change_platform",
-                        f"Move {train2_id} to Platform {platform} to avoid headway conflict",
-                        train2_id,
-                        conflict.station_id,
-                        platform,
-                    ),
-                    action_type="change_platform",
-                    description=f"Move {train2_id} to Platform {platform} to avoid headway conflict",
-                    train_id=train2_id,
-                    station_id=conflict.station_id,
-                    new_platform=platform,
-                    cost_benefit={
-                        "delay_reduction": 0,
-                        "conflicts_resolved": 1,
-                        "cost_score": 0.9
-                    },
-                    impact={
-                        "affected_trains": [train2_id],
-                        "total_delay_change": 0
-                    }
-                ))
+        alternatives = [platform for platform in available_platforms if platform != conflict.platform]
+        for platform in alternatives[:MAX_PLATFORM_ALTERNATIVES]:
+            recommendations.append(_Candidate(
+                action_type="change_platform",
+                description=f"Move {train2_id} to Platform {platform} to avoid headway conflict",
+                train_id=train2_id,
+                station_id=conflict.station_id,
+                new_platform=platform,
+                cost_benefit={
+                    "delay_reduction": 0,
+                    "conflicts_resolved": 1,
+                    "cost_score": 0.9
+                },
+                impact={
+                    "affected_trains": [train2_id],
+                    "total_delay_change": 0
+                }
+            ))
         
         return recommendations
     
     def _resolve_priority_conflict(self, schedule: List[ScheduleEntry], 
-                                 conflict: Conflict) -> List[Recommendation]:
+                                 conflict: Conflict) -> List[_Candidate]:
         """Generate recommendations to resolve priority conflicts"""
         recommendations = []
         
@@ -266,14 +298,7 @@ class RecommendationsEngine:
             low_priority_train = train1_id
         
         # Option 1: Swap priorities by delaying low priority train
-        recommendations.append(Recommendation(
-            id=stable_recommendation_id(
-                "swap_priority",
-                f"Give priority to {high_priority_train} by delaying {low_priority_train}",
-                low_priority_train,
-                conflict.station_id,
-                delay_minutes=10,
-            ),
+        recommendations.append(_Candidate(
             action_type="swap_priority",
             description=f"Give priority to {high_priority_train} by delaying {low_priority_train}",
             train_id=low_priority_train,
@@ -292,7 +317,7 @@ class RecommendationsEngine:
         
         return recommendations
     
-    def _generate_optimization_recommendations(self, schedule: List[ScheduleEntry]) -> List[Recommendation]:
+    def _generate_optimization_recommendations(self, schedule: List[ScheduleEntry]) -> List[_Candidate]:
         """Generate recommendations for general schedule optimization"""
         recommendations = []
         
@@ -302,9 +327,10 @@ class RecommendationsEngine:
             if not train:
                 continue
             
-            delay_minutes = (entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60
+            delay = entry.actual_arrival - train.scheduled_arrival
             
-            if delay_minutes > 15:  # Significant delay
+            if delay > SIGNIFICANT_DELAY:
+                delay_minutes = delay.total_seconds() / 60
                 # Look for better platform options
                 available_platforms = self._find_available_platforms(
                     schedule, entry.station_id, train.scheduled_arrival, train.scheduled_departure
@@ -314,14 +340,7 @@ class RecommendationsEngine:
                     if platform != entry.assigned_platform:
                         potential_delay_reduction = min(delay_minutes, 10)  # Estimate improvement
                         
-                        recommendations.append(Recommendation(
-                            id=stable_recommendation_id(
-                                "move_train",
-                                f"Move {entry.train_id} to Platform {platform} to reduce delay",
-                                entry.train_id,
-                                entry.station_id,
-                                platform,
-                            ),
+                        recommendations.append(_Candidate(
                             action_type="move_train",
                             description=f"Move {entry.train_id} to Platform {platform} to reduce delay",
                             train_id=entry.train_id,
@@ -341,90 +360,93 @@ class RecommendationsEngine:
         
         return recommendations
     
-    def _generate_proactive_recommendations(self, schedule: List[ScheduleEntry]) -> List[Recommendation]:
+    def _generate_proactive_recommendations(self, schedule: List[ScheduleEntry]) -> List[_Candidate]:
         """Generate proactive recommendations to prevent future issues"""
         recommendations = []
         
         # Analyze platform utilization
         platform_usage = self._analyze_platform_utilization(schedule)
+        index = self._platform_entries(schedule)
         
         for station_id, usage in platform_usage.items():
             station = self.stations.get(station_id)
             if not station:
                 continue
             
+            # Less utilized platform to move trains to: the first under 60%, which is never
+            # an overutilized one
+            alt_platform = next((p for p, alt_util in usage.items() if alt_util < 0.6), None)
+            if alt_platform is None:
+                continue
+            
             # Find overutilized platforms
             for platform, utilization in usage.items():
                 if utilization > 0.8:  # Over 80% utilization
                     # Find trains that could be moved to less utilized platforms
-                    station_entries = [e for e in schedule if e.station_id == station_id and e.assigned_platform == platform]
+                    station_entries = index.get(station_id, {}).get(platform, [])
                     
                     for entry in station_entries[:2]:  # Limit to 2 suggestions per platform
-                        # Find less utilized platforms
-                        for alt_platform, alt_util in usage.items():
-                            if alt_platform != platform and alt_util < 0.6:
-                                recommendations.append(Recommendation(
-                                    id=stable_recommendation_id(
-                                        "move_train",
-                                        f"Move {entry.train_id} from overloaded Platform {platform} to Platform {alt_platform}",
-                                        entry.train_id,
-                                        station_id,
-                                        alt_platform,
-                                    ),
-                                    action_type="move_train",
-                                    description=f"Move {entry.train_id} from overloaded Platform {platform} to Platform {alt_platform}",
-                                    train_id=entry.train_id,
-                                    station_id=station_id,
-                                    new_platform=alt_platform,
-                                    cost_benefit={
-                                        "delay_reduction": 5,  # Estimated improvement
-                                        "conflicts_resolved": 0,
-                                        "cost_score": 0.5
-                                    },
-                                    impact={
-                                        "affected_trains": [entry.train_id],
-                                        "total_delay_change": 0
-                                    }
-                                ))
-                                break
+                        recommendations.append(_Candidate(
+                            action_type="move_train",
+                            description=f"Move {entry.train_id} from overloaded Platform {platform} to Platform {alt_platform}",
+                            train_id=entry.train_id,
+                            station_id=station_id,
+                            new_platform=alt_platform,
+                            cost_benefit={
+                                "delay_reduction": 5,  # Estimated improvement
+                                "conflicts_resolved": 0,
+                                "cost_score": 0.5
+                            },
+                            impact={
+                                "affected_trains": [entry.train_id],
+                                "total_delay_change": 0
+                            }
+                        ))
         
         return recommendations
     
     def _find_available_platforms(self, schedule: List[ScheduleEntry], station_id: str, 
                                 arrival: datetime, departure: datetime) -> List[int]:
-        """Find platforms available during the specified time window"""
+        """Find platforms available during the specified time window; callers must not mutate the list"""
         station = self.stations.get(station_id)
         if not station:
             return []
         
+        # Resolvers often ask for the same window, e.g. a train in several conflicts
+        index = self._schedule_index(schedule)
+        key = (station_id, arrival, departure)
+        available = index[4].get(key)
+        if available is not None:
+            return available
+        
         available = []
-        station_entries = [e for e in schedule if e.station_id == station_id]
+        windows = index[2]
         
         for platform in range(1, station.platforms + 1):
-            platform_entries = [e for e in station_entries if e.assigned_platform == platform]
-            
-            # Check if platform is free during the time window
-            is_available = True
-            for entry in platform_entries:
-                if not (departure <= entry.actual_arrival or arrival >= entry.actual_departure):
-                    is_available = False
-                    break
-            
-            if is_available:
-                available.append(platform)
+            # Check if platform is free during the time window: of the entries arriving
+            # before our departure, the one leaving last must be gone by our arrival
+            window = windows.get((station_id, platform))
+            if window is not None:
+                arrivals, latest_departures = window
+                idx = bisect_left(arrivals, departure)
+                if idx and latest_departures[idx - 1] > arrival:
+                    continue
+            available.append(platform)
         
+        index[4][key] = available
         return available
     
     def _analyze_platform_utilization(self, schedule: List[ScheduleEntry]) -> Dict[str, Dict[int, float]]:
         """Analyze platform utilization across all stations"""
         utilization = {}
+        index = self._platform_entries(schedule)
         
         for station_id, station in self.stations.items():
             utilization[station_id] = {}
-            station_entries = [e for e in schedule if e.station_id == station_id]
+            station_entries = index.get(station_id, {})
             
             for platform in range(1, station.platforms + 1):
-                platform_entries = [e for e in station_entries if e.assigned_platform == platform]
+                platform_entries = station_entries.get(platform, ())
                 
                 if not platform_entries:
                     utilization[station_id][platform] = 0.0
@@ -441,39 +463,71 @@ class RecommendationsEngine:
         
         return utilization
     
-    def _score_recommendations(self, recommendations: List[Recommendation], 
-                             schedule: List[ScheduleEntry]) -> List[Recommendation]:
-        """Score recommendations based on impact and feasibility"""
+    def _dedupe_recommendations(self, recommendations: List[_Candidate]) -> List[_Candidate]:
+        """One recommendation per action, keeping the highest base score and first-seen order"""
+        best: Dict[tuple, _Candidate] = {}
         for rec in recommendations:
-            # Base score from cost_benefit
-            base_score = rec.cost_benefit.get("cost_score", 0.5)
-            
-            # Adjust based on delay impact
-            delay_change = rec.impact.get("total_delay_change", 0)
-            if delay_change < 0:  # Reduces delay
-                base_score += 0.2
-            elif delay_change > 10:  # Adds significant delay
-                base_score -= 0.3
-            
-            # Adjust based on conflicts resolved
-            conflicts_resolved = rec.cost_benefit.get("conflicts_resolved", 0)
-            base_score += conflicts_resolved * 0.1
-            
-            # Adjust based on number of affected trains
-            affected_count = len(rec.impact.get("affected_trains", []))
-            if affected_count == 1:
-                base_score += 0.1  # Prefer localized changes
-            elif affected_count > 3:
-                base_score -= 0.2  # Penalize wide-reaching changes
-            
-            # Update the cost_benefit score
-            rec.cost_benefit["cost_score"] = max(0.0, min(1.0, base_score))
+            key = (rec.action_type, rec.train_id, rec.station_id, rec.new_platform, rec.delay_minutes)
+            kept = best.get(key)
+            if kept is None or rec.cost_benefit.get("cost_score", 0.5) > kept.cost_benefit.get("cost_score", 0.5):
+                best[key] = rec
+        return list(best.values())
+    
+    def _score_recommendations(self, recommendations: List[_Candidate], 
+                             schedule: List[ScheduleEntry]) -> List[_Candidate]:
+        """Score recommendations based on impact and feasibility"""
+        count = len(recommendations)
+        
+        # Base score from cost_benefit
+        scores = np.fromiter((rec.cost_benefit.get("cost_score", 0.5) for rec in recommendations),
+                             dtype=np.float64, count=count)
+        
+        # Adjust based on delay impact: reduces delay / adds significant delay
+        delay_change = np.fromiter((rec.impact.get("total_delay_change", 0) for rec in recommendations),
+                                   dtype=np.float64, count=count)
+        scores += np.where(delay_change < 0, 0.2, np.where(delay_change > 10, -0.3, 0.0))
+        
+        # Adjust based on conflicts resolved
+        conflicts_resolved = np.fromiter((rec.cost_benefit.get("conflicts_resolved", 0) for rec in recommendations),
+                                         dtype=np.float64, count=count)
+        scores += conflicts_resolved * 0.1
+        
+        # Adjust based on number of affected trains: prefer localized changes, penalize wide-reaching ones
+        affected_count = np.fromiter((len(rec.impact.get("affected_trains", [])) for rec in recommendations),
+                                     dtype=np.intp, count=count)
+        scores += np.where(affected_count == 1, 0.1, np.where(affected_count > 3, -0.2, 0.0))
+        
+        # Update the cost_benefit score
+        for rec, score in zip(recommendations, np.clip(scores, 0.0, 1.0).tolist()):
+            rec.cost_benefit["cost_score"] = score
         
         return recommendations
     
+    def _schedule_index(self, schedule: List[ScheduleEntry]) -> tuple:
+        """Per-platform and per-train views of schedule, built in one pass once per schedule"""
+        if self._index is None or self._index[0] is not schedule:
+            entries: Dict[str, Dict[int, List[ScheduleEntry]]] = {}
+            first_entries: Dict[str, ScheduleEntry] = {}
+            for entry in schedule:
+                entries.setdefault(entry.station_id, {}).setdefault(entry.assigned_platform, []).append(entry)
+                first_entries.setdefault(entry.train_id, entry)
+            windows = {}
+            for station_id, platforms in entries.items():
+                for platform, platform_entries in platforms.items():
+                    spans = sorted((e.actual_arrival, e.actual_departure) for e in platform_entries)
+                    windows[(station_id, platform)] = (
+                        [a for a, _ in spans], list(accumulate((d for _, d in spans), max))
+                    )
+            self._index = (schedule, entries, windows, first_entries, {})
+        return self._index
+    
+    def _platform_entries(self, schedule: List[ScheduleEntry]) -> Dict[str, Dict[int, List[ScheduleEntry]]]:
+        """Entries of schedule grouped by station and platform, in schedule order"""
+        return self._schedule_index(schedule)[1]
+    
     def _get_train(self, train_id: str) -> Optional[Train]:
         """Get train object by ID"""
-        return next((t for t in self.trains if t.id == train_id), None)
+        return self._train_by_id.get(train_id)
 
 
 def generate_recommendations(trains: List[Train], stations: Dict[str, Station], 
@@ -481,6 +535,10 @@ def generate_recommendations(trains: List[Train], stations: Dict[str, Station],
                            max_recommendations: int = 10) -> List[Recommendation]:
     """
     Main entry point for generating recommendations
+    
+    Pass the conflicts already detected for schedule (e.g. from detect_conflicts_cached)
+    so they are not detected again; a RecommendationsEngine reused across calls
+    detects them once per schedule otherwise.
     """
     engine = RecommendationsEngine(trains, stations)
     return engine.generate_recommendations(schedule, conflicts, max_recommendations)
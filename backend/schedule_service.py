@@ -5,12 +5,70 @@ import copy
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
+
 from conflict_detector import detect_conflicts
 from ilp_optimizer import ilp_optimizer
 from models import Conflict, LogEntry, OptimizerSettings, ScheduleEntry, Station, Train
 from optimizer import greedy_optimizer, greedy_optimizer_with_delays
 
 
+def index_by_train(entries: List[ScheduleEntry]) -> Dict[str, ScheduleEntry]:
+    """Index entries by train id, keeping each train's first entry like a linear scan would."""
+    index: Dict[str, ScheduleEntry] = {}
+    for entry in entries:
+        index.setdefault(entry.train_id, entry)
+    return index
+
+
+def index_by_train_station(entries: List[ScheduleEntry]) -> Dict[Tuple[str, str], ScheduleEntry]:
+    """Index entries by (train id, station id), keeping the first match."""
+    index: Dict[Tuple[str, str], ScheduleEntry] = {}
+    for entry in entries:
+        index.setdefault((entry.train_id, entry.station_id), entry)
+    return index
+
+
+def changed_entries(
+    old_entries: List[ScheduleEntry],
+    new_entries: List[ScheduleEntry],
+    by_station: bool = True,
+) -> List[Tuple[ScheduleEntry, Optional[ScheduleEntry]]]:
+    """(new, old) pairs whose platform or arrival differs; old is None when the new entry has no match.
+
+    Entries are matched on (train id, station id), or on train id alone with the
+    train's first old entry. Both sides are flattened to (platform, arrival) tuples
+    once so the comparison pass does no per-entry model attribute lookups.
+    """
+    old_slots: Dict[object, Tuple[int, datetime, ScheduleEntry]] = {}
+    if by_station:
+        for e in old_entries:
+            old_slots.setdefault((e.train_id, e.station_id), (e.assigned_platform, e.actual_arrival, e))
+        new_slots = [((e.train_id, e.station_id), e.assigned_platform, e.actual_arrival, e) for e in new_entries]
+    else:
+        for e in old_entries:
+            old_slots.setdefault(e.train_id, (e.assigned_platform, e.actual_arrival, e))
+        new_slots = [(e.train_id, e.assigned_platform, e.actual_arrival, e) for e in new_entries]
+
+    missing = (None, None, None)
+    changed = []
+    for key, platform, arrival, entry in new_slots:
+        old_platform, old_arrival, old_entry = old_slots.get(key, missing)
+        if old_platform != platform or old_arrival != arrival:
+            changed.append((entry, old_entry))
+    return changed
+
+
+def arrival_delays(pairs: List[Tuple[Optional[ScheduleEntry], Train]]) -> np.ndarray:
+    """Delay in minutes (clamped at 0) of each entry against its train's booked arrival; None entries count 0."""
+    offsets = np.fromiter(
+        ((entry.actual_arrival - train.scheduled_arrival).total_seconds() if entry else 0.0 for entry, train in pairs),
+        dtype=np.float64,
+        count=len(pairs),
+    )
+    return np.maximum(0.0, offsets / 60.0)
+
+
 def ensure_baseline(
     trains: List[Train],
     stations: Dict[str, Station],
@@ -22,7 +80,7 @@ def ensure_baseline(
         return baseline_schedule
     baseline = greedy_optimizer(trains, stations, {}, legs_override=legs_override)
     logs.append(
-        LogEntry(
+        LogEntry.model_construct(
             timestamp=datetime.now(),
             action="baseline_created",
             details=f"Generated baseline schedule with {len(baseline)} assignments",
@@ -51,28 +109,32 @@ def recompute_schedule(
     else:
         schedule = greedy_optimizer(trains, stations, fixed_overrides, legs_override=legs_override)
 
+    conflicts, step = summarize_schedule(trains, stations, fixed_overrides, schedule, old_schedule)
+    return schedule, conflicts, step
+
+
+def summarize_schedule(
+    trains: List[Train],
+    stations: Dict[str, Station],
+    fixed_overrides: Dict[str, int],
+    schedule: List[ScheduleEntry],
+    old_schedule: List[ScheduleEntry],
+) -> Tuple[List[Conflict], dict]:
+    """Conflicts and the optimization-history step for a new schedule against the previous one."""
     conflicts, conflict_impact = detect_conflicts(trains, stations, schedule)
 
     changes = []
     if old_schedule:
-        for new_entry in schedule:
-            old_entry = next(
-                (s for s in old_schedule if s.train_id == new_entry.train_id and s.station_id == new_entry.station_id),
-                None,
+        for new_entry, old_entry in changed_entries(old_schedule, schedule):
+            changes.append(
+                {
+                    "train_id": new_entry.train_id,
+                    "station_id": new_entry.station_id,
+                    "old_platform": old_entry.assigned_platform if old_entry else "none",
+                    "new_platform": new_entry.assigned_platform,
+                    "reason": new_entry.reason,
+                }
             )
-            if not old_entry or (
-                old_entry.assigned_platform != new_entry.assigned_platform
-                or old_entry.actual_arrival != new_entry.actual_arrival
-            ):
-                changes.append(
-                    {
-                        "train_id": new_entry.train_id,
-                        "station_id": new_entry.station_id,
-                        "old_platform": old_entry.assigned_platform if old_entry else "none",
-                        "new_platform": new_entry.assigned_platform,
-                        "reason": new_entry.reason,
-                    }
-                )
 
     step = {
         "timestamp": datetime.now().isoformat(),
@@ -81,7 +143,7 @@ def recompute_schedule(
         "conflicts_resolved": 0,
         "conflict_impact": conflict_impact,
     }
-    return schedule, conflicts, step
+    return conflicts, step
 
 
 def build_schedule_payload(
@@ -90,28 +152,15 @@ def build_schedule_payload(
     trains: List[Train],
     conflicts: List[Conflict],
 ) -> dict:
-    delays_after: List[float] = []
-    delays_before: List[float] = []
-    reasons: List[str] = []
-
-    for s in schedule:
-        train = next((t for t in trains if t.id == s.train_id), None)
-        if not train:
-            continue
-        delay_after = max(0.0, (s.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0)
-        delays_after.append(delay_after)
-        baseline_entry = next(
-            (b for b in baseline_schedule if b.train_id == s.train_id and b.station_id == s.station_id),
-            None,
-        )
-        if baseline_entry:
-            delay_before = max(
-                0.0, (baseline_entry.actual_arrival - train.scheduled_arrival).total_seconds() / 60.0
-            )
-        else:
-            delay_before = 0.0
-        delays_before.append(delay_before)
-        reasons.append(s.reason)
+    trains_by_id = {t.id: t for t in trains}
+    baseline_by_key = index_by_train_station(baseline_schedule)
+
+    known = [(s, trains_by_id[s.train_id]) for s in schedule if s.train_id in trains_by_id]
+    delays_after = arrival_delays(known).tolist()
+    delays_before = arrival_delays(
+        [(baseline_by_key.get((s.train_id, s.station_id)), train) for s, train in known]
+    ).tolist()
+    reasons = [s.reason for s, _ in known]
 
     return {
         "schedule": schedule,
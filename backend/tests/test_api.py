@@ -38,3 +38,94 @@ def test_track_status():
     r = client.get("/track-status")
     assert r.status_code == 200
     assert "track_occupancy" in r.json()
+
+
+def _fresh_movements(monkeypatch):
+    """Empty movement and track state for one test, restored afterwards"""
+    for name in ("train_movements", "track_occupancy", "track_intervals", "train_tracks", "track_pending"):
+        monkeypatch.setattr(main.state, name, {})
+    monkeypatch.setattr(main.state, "track_expiry", [])
+    monkeypatch.setattr(main.state, "conflict_log", main.deque(maxlen=main.CONFLICT_LOG_MAX))
+
+
+def test_forced_track_conflict_is_left_for_the_movement_tick(monkeypatch):
+    from datetime import datetime, timedelta
+
+    from models import ScheduleEntry
+
+    now = datetime.now()
+    schedule = [
+        ScheduleEntry(train_id=train_id, station_id="SC", assigned_platform=1, actual_arrival=now,
+                      actual_departure=now + timedelta(minutes=5), reason="test")
+        for train_id in ("T101", "T102")
+    ]
+    monkeypatch.setattr(main.state, "schedule", schedule)
+    _fresh_movements(monkeypatch)
+
+    assert client.post("/force-conflict").json()["status"] == "success"
+
+    # Reads report the pending conflict without consuming it
+    assert client.get("/conflicts").json()["active_conflicts"] == 1
+    assert client.get("/track-status").json()["conflicts_detected"] == 1
+    assert client.get("/conflicts").json()["active_conflicts"] == 1
+
+    main.update_train_movements()
+    delays = sorted(main.state.train_movements[train_id].delay_minutes for train_id in ("T101", "T102"))
+    assert delays == [0, 5]
+    assert [log["type"] for log in main.state.conflict_log] == ["track_conflict", "conflict_resolved"]
+
+
+def test_conflicts_and_recommendations_etags(monkeypatch):
+    client.get("/schedule")
+    for name in ("schedule", "baseline_schedule", "fixed_overrides", "current_conflicts"):
+        monkeypatch.setattr(main.state, name, getattr(main.state, name))
+    paths = ("/conflicts", "/recommendations")
+
+    etags = {}
+    for path in paths:
+        etags[path] = client.get(path).headers["etag"]
+        again = client.get(path, headers={"If-None-Match": etags[path]})
+        assert again.status_code == 304
+        assert again.headers["etag"] == etags[path]
+
+    # An override changes the schedule, so both endpoints answer in full under a new tag
+    entry = main.state.schedule[0]
+    platforms = main.state.stations[entry.station_id].platforms
+    r = client.post("/override", json={
+        "train_id": entry.train_id,
+        "station_id": entry.station_id,
+        "new_platform": entry.assigned_platform % platforms + 1,
+    })
+    assert r.status_code == 200
+    for path in paths:
+        changed = client.get(path, headers={"If-None-Match": etags[path]})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etags[path]
+
+
+def test_track_conflict_chain_is_rechecked_on_the_next_tick(monkeypatch):
+    from datetime import datetime, timedelta
+
+    monkeypatch.setattr(main.state, "schedule", [])
+    _fresh_movements(monkeypatch)
+    now = datetime.now()
+    for train_id, offset in (("T101", 0), ("T102", 1)):
+        start = now + timedelta(minutes=offset)
+        main.state.train_movements[train_id] = main.TrainMovement(
+            train_id=train_id, from_station="SC", to_station="KCG",
+            start_time=start, end_time=start + timedelta(minutes=15), status="moving",
+        )
+        main.mark_track_window_changed(train_id)
+
+    # Each 5-minute shift still overlaps until the windows clear, and every
+    # re-check is due at once rather than after the idle cap
+    ticks = 0
+    while True:
+        due = main.update_train_movements()
+        ticks += 1
+        if due > datetime.now():
+            break
+        assert ticks < 10
+    assert not main.state.track_pending
+    assert main.peek_track_conflicts() == []
+    assert main.state.train_movements["T102"].delay_minutes == 15
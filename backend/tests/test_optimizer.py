@@ -1,8 +1,14 @@
 """Greedy and ILP optimizer tests."""
-from optimizer import greedy_optimizer
+from datetime import datetime, timedelta
+
+import numpy as np
+import pulp
+
+import ilp_optimizer as ilp_module
+from optimizer import greedy_optimizer, repair_override
 from ilp_optimizer import ilp_optimizer
-from models import OptimizerSettings
-from conflict_detector import detect_conflicts
+from models import OptimizerSettings, ScheduleEntry, Station, Train
+from conflict_detector import _flag_pairs_numpy, _sweep_kernel, detect_conflicts
 
 
 def test_greedy_schedules_all_trains(trains, stations, legs_override):
@@ -28,8 +34,90 @@ def test_ilp_optimizer_fallback(trains, stations, legs_override):
     assert len(schedule) >= len(trains)
 
 
+def test_ilp_solver_falls_back_to_cbc_without_highs_names(monkeypatch):
+    get_solver = pulp.getSolver
+
+    def old_get_solver(name, *args, **kwargs):
+        # Older PuLP releases do not know the HiGHS solver names at all
+        if name.startswith("HiGHS"):
+            raise pulp.PulpSolverError(f"Unknown solver {name}")
+        return get_solver(name, *args, **kwargs)
+
+    monkeypatch.setattr(pulp, "getSolver", old_get_solver)
+    monkeypatch.setattr(ilp_module, "_preferred_solver", None)
+    assert isinstance(ilp_module._make_solver(pulp, 10, 0.01, 1), pulp.PULP_CBC_CMD)
+
+
 def test_conflict_detector_runs(trains, stations, legs_override):
     schedule = greedy_optimizer(trains, stations, {}, legs_override=legs_override)
     conflicts, impact = detect_conflicts(trains, stations, schedule)
     assert isinstance(conflicts, list)
     assert isinstance(impact, dict)
+
+
+def _one_platform(*windows):
+    """Trains of equal priority and their entries on SC platform 1, one per (arrival, departure) minute pair"""
+    base = datetime(2025, 1, 1, 8)
+    trains, schedule = [], []
+    for i, (arrival, departure) in enumerate(windows):
+        start, end = base + timedelta(minutes=arrival), base + timedelta(minutes=departure)
+        trains.append(Train(id=f"T{i}", type="Express", priority=3, origin="SC", destination="KCG",
+                            scheduled_arrival=start, scheduled_departure=end))
+        schedule.append(ScheduleEntry(train_id=f"T{i}", station_id="SC", assigned_platform=1,
+                                      actual_arrival=start, actual_departure=end, reason="test"))
+    return trains, {"SC": Station(id="SC", platforms=2)}, schedule
+
+
+def test_detector_reports_every_overlapping_pair():
+    # T0 dwells across both later arrivals, and T1 overlaps T2 as well
+    trains, stations, schedule = _one_platform((0, 30), (5, 25), (10, 20))
+    conflicts, _ = detect_conflicts(trains, stations, schedule)
+    assert sorted(c.trains_involved for c in conflicts if c.type == "platform_overlap") == [
+        ("T0", "T1"), ("T0", "T2"), ("T1", "T2"),
+    ]
+
+
+def test_overlap_is_not_also_a_headway_violation():
+    trains, stations, schedule = _one_platform((0, 10), (5, 15))
+    conflicts, _ = detect_conflicts(trains, stations, schedule)
+    assert [(c.type, c.trains_involved) for c in conflicts] == [("platform_overlap", ("T0", "T1"))]
+
+    # Two minutes apart: clear of each other but inside the 5-minute headway
+    trains, stations, schedule = _one_platform((0, 10), (12, 20))
+    conflicts, _ = detect_conflicts(trains, stations, schedule)
+    assert [(c.type, c.trains_involved) for c in conflicts] == [("headway_violation", ("T0", "T1"))]
+
+
+def test_sweep_kernel_matches_numpy_pairs():
+    # _sweep_kernel only runs compiled when numba is installed, so check it as plain Python
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        n = int(rng.integers(1, 40))
+        # Whole minutes over a short span: tied arrivals, shared endpoints and
+        # clusters of mutually overlapping occupants on the same platform
+        arrival = np.sort(rng.integers(0, 60, n)).astype(np.float64) * 60
+        departure = arrival + rng.choice([0, 1, 3, 5, 10, 30], n) * 60.0
+        platform_rank = rng.integers(0, int(rng.integers(1, 4)), n)
+        priority = rng.choice([1.0, 3.0, 5.0, np.nan], n)
+
+        def pairs(flag):
+            first, second, code = flag(arrival, departure, platform_rank, priority, 300.0, 1800.0)
+            return sorted(zip(first.tolist(), second.tolist(), code.tolist()))
+
+        assert pairs(_sweep_kernel) == pairs(_flag_pairs_numpy)
+
+
+def test_repair_override_keeps_every_leg(trains, stations, legs_override):
+    schedule = greedy_optimizer(trains, stations, {}, legs_override=legs_override)
+    target = trains[0]
+    fixed = {target.id: 2}
+    repaired = repair_override(schedule, trains, stations, fixed, target.id, legs_override, max_affected_ratio=1.0)
+    full = greedy_optimizer(trains, stations, fixed, legs_override=legs_override)
+
+    key = lambda e: (e.train_id, e.station_id)
+    assert sorted(map(key, repaired)) == sorted(map(key, full))
+    assert repaired[0].train_id == target.id
+    assert repaired[0].reason.startswith(("OVERRIDE", "forced"))
+    # Trains the override does not touch keep their entries as-is
+    touched = {e.train_id for e in repaired if e not in schedule}
+    assert len(touched) < len(trains)
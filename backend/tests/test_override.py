@@ -22,3 +22,31 @@ def test_override_then_schedule_stable():
     assert r.status_code == 200
     after = client.get("/schedule").json()
     assert len(after["schedule"]) == len(before["schedule"])
+
+
+def test_override_after_clear_delays_keeps_every_leg(monkeypatch):
+    client.get("/schedule")
+    for name in ("schedule", "legs_schedule", "baseline_schedule", "fixed_overrides", "active_delays",
+                 "current_conflicts"):
+        monkeypatch.setattr(main.state, name, getattr(main.state, name))
+
+    # /clear-delays rebuilds the live schedule without the per-train legs
+    assert client.delete("/clear-delays").status_code == 200
+    entry = main.state.schedule[0]
+    platforms = main.state.stations[entry.station_id].platforms
+    r = client.post("/override", json={
+        "train_id": entry.train_id,
+        "station_id": entry.station_id,
+        "new_platform": entry.assigned_platform % platforms + 1,
+    })
+    assert r.status_code == 200
+
+    def legs(schedule):
+        stops = {}
+        for e in schedule:
+            stops.setdefault(e.train_id, []).append(e.station_id)
+        return {train_id: sorted(stations) for train_id, stations in stops.items()}
+
+    full = main.greedy_optimizer(main.state.trains, main.state.stations, main.state.fixed_overrides,
+                                 legs_override=main.train_legs_override)
+    assert legs(main.state.schedule) == legs(full)
@@ -0,0 +1,41 @@
+"""Recommendations engine tests."""
+import random
+from datetime import datetime, timedelta
+
+from models import ScheduleEntry, Station
+from recommendations import RecommendationsEngine
+
+
+def _scan_available_platforms(schedule, station, arrival, departure):
+    """Every-entry scan _find_available_platforms replaced"""
+    return [
+        platform for platform in range(1, station.platforms + 1)
+        if all(departure <= e.actual_arrival or arrival >= e.actual_departure
+               for e in schedule if e.station_id == station.id and e.assigned_platform == platform)
+    ]
+
+
+def test_find_available_platforms_matches_scan():
+    rnd = random.Random(0)
+    base = datetime(2025, 1, 1, 8)
+    stations = {"HYB": Station(id="HYB", platforms=3), "SC": Station(id="SC", platforms=4)}
+    queries = 0
+    for _ in range(30):
+        # Whole minutes in a short window, so overlaps, shared endpoints and zero-length stays are common
+        schedule = []
+        for i in range(rnd.choice([0, 5, 20, 60])):
+            arrival = base + timedelta(minutes=rnd.randrange(0, 120))
+            schedule.append(ScheduleEntry(
+                train_id=f"T{i}", station_id=rnd.choice(list(stations)),
+                assigned_platform=rnd.randint(1, 4), actual_arrival=arrival,
+                actual_departure=arrival + timedelta(minutes=rnd.choice([0, 1, 5, 15, 40])), reason="test",
+            ))
+        engine = RecommendationsEngine([], stations)
+        for _ in range(200):
+            station = stations[rnd.choice(list(stations))]
+            arrival = base + timedelta(minutes=rnd.randrange(-10, 130))
+            departure = arrival + timedelta(minutes=rnd.choice([0, 1, 5, 15, 40]))
+            assert engine._find_available_platforms(schedule, station.id, arrival, departure) == \
+                _scan_available_platforms(schedule, station, arrival, departure)
+            queries += 1
+    assert queries == 6000